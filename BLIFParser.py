@@ -1,8 +1,8 @@
 import blifparser.blifparser as blifparser
 import pyperclip
-import itertools
 
 from CircuitMaker import Creation, Component, ComponentTypes
+from Placement import legalize
 
 class Wire:
 	def __init__(self, inputs = None, outputs = None):
@@ -119,6 +119,9 @@ def main():
 	wire = wire_mapping.get("$true")
 	wire.inputs.append(creation.new_component(ComponentTypes.GATE_NOR, position=(0, -1, 0)))
 
+	# Everything placed so far keeps its position, the gates added below are laid out on a grid and legalized around it
+	placed = {id(component) for component in creation.components}
+
 	for node in blif.subcircuits:
 		name = node.modelname
 
@@ -220,16 +223,16 @@ def main():
 
 
 	creation.bridge_connections()
-	
-	io_table = list(itertools.chain(creation.get_inputs(), creation.get_outputs(), creation.get_unconnected()))
 
-	#for obj in io_table:
-		#if obj.type not in [ComponentTypes.NODE, ComponentTypes.TILE]:
-		#	creation.remove_component(obj)
+	width = max(x, 1)
+	movable = [idx for idx, node in enumerate(creation.components) if id(node) not in placed]
+	positions = [node.position for node in creation.components]
+
+	for idx, component in enumerate(movable, width):
+		positions[component] = (idx % width, 0, idx // width)
 
-	for idx, node in enumerate(filter(lambda v: v not in io_table, creation.components)):
-		idx += x
-		node.position = (idx % x, 0, idx // x)
+	for node, position in zip(creation.components, legalize(positions, movable)):
+		node.position = position
 
 	time_min, time_max = [], []
 
@@ -1,6 +1,21 @@
 import pathlib
+import hashlib
 import numpy as np
+import struct
+import codecs
+import lzma
+import zlib
+import os
+import tempfile
+import zipfile
+import contextlib
+import concurrent.futures
+import collections
+import itertools
+import operator
+import array
 import enum
+import re
 
 
 class ComponentTypes(enum.Enum):
@@ -58,45 +73,119 @@ class CollisionTypes(enum.Enum):
 	SOLID = 0
 	COLLIDER = 1
 
+class SaveSections(enum.Enum):
+	BLOCKS  = 0
+	WIRES   = 1
+	CUSTOMS = 2
+
+class OrderingTypes(enum.Enum):
+	LOCALITY = 0 # Reverse Cuthill-McKee, short index distances (best with delta_wires and compression)
+	DEGREE   = 1 # Most connected first, fewest digits in a plain save
+
+class CompressionTypes(enum.Enum):
+	NONE = 0
+	ZLIB = 1
+	LZMA = 2
+
 
 default_augments = {
-	ComponentTypes.GATE_NOR:           [],
-	ComponentTypes.GATE_AND:           [],
-	ComponentTypes.GATE_OR:            [],
-	ComponentTypes.GATE_XOR:           [],
-	ComponentTypes.BUTTON:             [],
-	ComponentTypes.FLIPFLOP:           [],
-	ComponentTypes.LED:                [175, 175, 175, 100, 25, 0],
-	ComponentTypes.SOUND:              [1567.98, WaveTypes.SINE],
-	ComponentTypes.CONDUCTOR:          [],
-	ComponentTypes.CUSTOM_IO:          [],
-	ComponentTypes.GATE_NAND:          [],
-	ComponentTypes.GATE_XNOR:          [],
-	ComponentTypes.RANDOM:             [0.5],
-	ComponentTypes.TEXT:               [65],
-	ComponentTypes.TILE:               [75, 75, 75, MaterialTypes.STUD, CollisionTypes.SOLID],
-	ComponentTypes.NODE:               [],
-	ComponentTypes.DELAY:              [20],
-	ComponentTypes.ANTENNA:            [0, AntennaTypes.LOCAL],
-	ComponentTypes.IMPROVED_CONDUCTOR: [],
-	ComponentTypes.LED_MIXER:          [0.0]
+	ComponentTypes.GATE_NOR:           (),
+	ComponentTypes.GATE_AND:           (),
+	ComponentTypes.GATE_OR:            (),
+	ComponentTypes.GATE_XOR:           (),
+	ComponentTypes.BUTTON:             (),
+	ComponentTypes.FLIPFLOP:           (),
+	ComponentTypes.LED:                (175, 175, 175, 100, 25, 0),
+	ComponentTypes.SOUND:              (1567.98, WaveTypes.SINE),
+	ComponentTypes.CONDUCTOR:          (),
+	ComponentTypes.CUSTOM_IO:          (),
+	ComponentTypes.GATE_NAND:          (),
+	ComponentTypes.GATE_XNOR:          (),
+	ComponentTypes.RANDOM:             (0.5,),
+	ComponentTypes.TEXT:               (65,),
+	ComponentTypes.TILE:               (75, 75, 75, MaterialTypes.STUD, CollisionTypes.SOLID),
+	ComponentTypes.NODE:               (),
+	ComponentTypes.DELAY:              (20,),
+	ComponentTypes.ANTENNA:            (0, AntennaTypes.LOCAL),
+	ComponentTypes.IMPROVED_CONDUCTOR: (),
+	ComponentTypes.LED_MIXER:          (0.0,)
 }
 
 # <ID>,<STATE>,<X>,<Y>,<Z>,<BLOCK-DEPENDANT-AUGMENTS>
 class Component:
+	__slots__ = ("_augments", "_position", "outputs", "inputs", "_state", "_type", "_fragment")
+
 	def __init__(self, type=ComponentTypes.GATE_NOR, state=StateTypes.OFF, position=(0, 0, 0), inputs=None, outputs=None, augments=None):
-		self.augments = augments or default_augments[ComponentTypes(type)]
-		self.position = np.array(position)
+		type = ComponentTypes(type)
+
+		self._augments = augments or default_augments[type]
+		self._position = position.copy() if isinstance(position, np.ndarray) else position
 		self.outputs = outputs or []
 		self.inputs = inputs or []
-		self.state = state
-		self.type = ComponentTypes(type)
+		self._state = state
+		self._type = type
+		self._fragment = None
+
+	# Positions are kept as given (usually a tuple) and only turned into an array once something asks for it
+	@property
+	def position(self):
+		if not isinstance(self._position, np.ndarray):
+			self._position = np.array(self._position)
+
+		return self._position
+
+	@position.setter
+	def position(self, position):
+		self._position = position
+		self._fragment = None
+
+	@property
+	def state(self):
+		return self._state
+
+	@state.setter
+	def state(self, state):
+		self._state = state
+		self._fragment = None
+
+	@property
+	def type(self):
+		return self._type
+
+	@type.setter
+	def type(self, type):
+		self._type = type
+		self._fragment = None
+
+	@property
+	def augments(self):
+		return self._augments
+
+	@augments.setter
+	def augments(self, augments):
+		self._augments = augments
+		self._fragment = None
+
+	# Serialized block, cached together with the position and augments it was built from.
+	# Both can be modified in place (position arrays, augment lists), so they are compared on every call.
+	def fragment(self, optimize=False, rounding=True):
+		position = self._position
+		key = (
+			optimize, rounding,
+			tuple(position.tolist() if isinstance(position, np.ndarray) else position),
+			tuple(self._augments)
+		)
+
+		if self._fragment is None or self._fragment[0] != key:
+			self._fragment = (key, serialize_block(self, optimize, rounding))
+
+		return self._fragment[1]
 
 	def connection_count(self):
 		return len(self.inputs) + len(self.outputs)
 	
 	def clone(self):
-		return Component(self.type, self.state, self.position.copy(), self.inputs.copy(), self.outputs.copy(), self.augments)
+		return Component(self.type, self.state, self._position, self.inputs.copy(), self.outputs.copy(), self.augments)
 	
 	def __repr__(self):
 		return f"<Component type={self.type.name} state={self.state.name}>"
@@ -117,7 +206,7 @@ def _build_position(position, rounding):
 	return pos
 
 def _build_augments(augments, instance_type):
-	augment_list = [int(c.value) if issubclass(type(c), enum.Enum) else int(c) for c in augments]
+	augment_list = tuple(int(c.value) if issubclass(type(c), enum.Enum) else int(c) for c in augments)
 	
 	if augment_list == default_augments[instance_type]:
 		return ''
@@ -141,12 +230,15 @@ def _parse_augments(augment_list, block_type):
 		else:
 			yield augment_type(val)
 
+def _format_block(block_type, state, position, augment, optimize):
+	space = '' if optimize else '0'
+	return f"{block_type},{state or space},{position[0] or space},{position[1] or space},{position[2] or space},{augment}"
+
 def serialize_block(instance, optimize=False, rounding=True):
-	position = _build_position(instance.position, rounding)
+	position = _build_position(instance._position, rounding)
 	augment = _build_augments(instance.augments, instance.type)
 
-	space = '' if optimize else '0'
-	return f"{instance.type.value},{instance.state.value or space},{position[0] or space},{position[1] or space},{position[2] or space},{augment}"
+	return _format_block(instance.type.value, instance.state.value, position, augment, optimize)
 
 def deserialize_block(data):
 	[raw_type, state, x, y, z, augments] = data.split(',')
@@ -155,7 +247,7 @@ def deserialize_block(data):
 	return Component(
 		type=block_type,
 		state=StateTypes(int(state or 0)),
-		position=np.array(tuple(map(float, [x or 0, y or 0, z or 0]))),
+		position=(float(x or 0), float(y or 0), float(z or 0)),
 		augments=tuple(_parse_augments(augments, block_type))
 	)
 
@@ -173,13 +265,251 @@ def deserialize_wire(wire, components):
 	target.inputs.append(source)
 
 
+# Bulk counterpart of deserialize_block, converts a batch of block strings into (types, states, positions, augments) columns.
+# Augments are returned unparsed since they are the only block-dependant field.
+def parse_blocks(blocks, dtype=np.float32):
+	if len(blocks) <= 0:
+		return np.zeros(0, np.uint8), np.zeros(0, np.uint8), np.zeros((0, 3), dtype), np.zeros(0, object)
+
+	# Checked per block, a short block followed by a long one would otherwise shift the columns without changing the total
+	for block in blocks:
+		if block.count(',') != 5:
+			raise ValueError(f"Block \"{block}\" does not have 6 fields")
+
+	tokens = ",".join(blocks).split(',')
+	augments = tokens[5::6]
+	del tokens[5::6]
+
+	fields = np.array([token or '0' for token in tokens], np.float64).reshape(-1, 5)
+
+	# Checked before the casts below, which would wrap out of range values instead of failing
+	for (column, enum_type) in [(0, ComponentTypes), (1, StateTypes)]:
+		invalid = ~np.isin(fields[:, column], [member.value for member in enum_type])
+
+		if invalid.any():
+			raise ValueError(f"{fields[invalid, column][0]:g} is not a valid {enum_type.__name__}")
+
+	return fields[:, 0].astype(np.uint8), fields[:, 1].astype(np.uint8), fields[:, 2:5].astype(dtype), np.array(augments, object)
+
+# Bulk counterpart of deserialize_wire, returns zero based (sources, targets)
+def parse_wires(wires):
+	indices = np.array(",".join(wires).split(',') if len(wires) > 0 else [], np.int64).reshape(-1, 2) - 1
+
+	return indices[:, 0], indices[:, 1]
+
+
+def _read_chunks(source, chunk_size):
+	if hasattr(source, "read"):
+		while chunk := source.read(chunk_size):
+			yield chunk
+	else:
+		yield from source
+
+# Yields (section, token) pairs while scanning, only ever holding one chunk plus a partial token in memory.
+# Delta encoded saves (see encode_delta_wires) are recognized by their leading marker and decoded on the fly.
+def scan_save(source, chunk_size=1 << 16):
+	section = 0
+	pending = ''
+	delta = None
+	previous = 0
+
+	def token_of(token):
+		nonlocal previous
+
+		if not delta or section != SaveSections.WIRES.value:
+			return token
+
+		[source, target] = token.split(',')
+		source = previous + int(source)
+		previous = source
+
+		return f"{source},{source + int(target)}"
+
+	for chunk in _read_chunks(source, chunk_size):
+		if delta is None and len(chunk) > 0:
+			delta = chunk[0] == c_delta_marker
+			chunk = chunk[1:] if delta else chunk
+
+		parts = re.split(r"([;?])", pending + chunk)
+		pending = parts.pop()
+
+		for token, separator in zip(parts[0::2], parts[1::2]):
+			if section > SaveSections.CUSTOMS.value:
+				return
+
+			if len(token) > 0:
+				yield SaveSections(section), token_of(token)
+
+			if separator == '?':
+				section += 1
+
+	if len(pending) > 0 and section <= SaveSections.CUSTOMS.value:
+		yield SaveSections(section), token_of(pending)
+
+c_delta_marker = '~'
+c_lzma_magic = b"\xfd7zXZ\x00"
+
+# Transport form of a save where every wire is written as (source - previous source, target - source), nearby indices
+# turn into short numbers which shrinks the text and compresses better. The game cannot read it, scan_save can.
+def encode_delta_wires(chunks):
+	yield c_delta_marker
+
+	section = SaveSections.BLOCKS
+	separator = ''
+	previous = 0
+
+	for (token_section, token) in scan_save(chunks):
+		if token_section == SaveSections.CUSTOMS:
+			break # @todo Customs
+
+		if token_section != section:
+			yield '?'
+			section = token_section
+			separator = ''
+
+		if section == SaveSections.WIRES:
+			[source, target] = map(int, token.split(','))
+			token = f"{source - previous},{target - source}"
+			previous = source
+
+		yield separator + token
+		separator = ';'
+
+	yield '??' if section == SaveSections.WIRES else '???'
+
+def write_save(filepath, chunks, compression=CompressionTypes.NONE, delta_wires=False):
+	if delta_wires:
+		chunks = encode_delta_wires(chunks)
+
+	match compression:
+		case CompressionTypes.NONE:
+			with open(filepath, 'w') as file:
+				file.writelines(chunks)
+
+		case CompressionTypes.ZLIB:
+			compressor = zlib.compressobj(9)
+
+			with open(filepath, 'wb') as file:
+				for chunk in chunks:
+					file.write(compressor.compress(chunk.encode()))
+
+				file.write(compressor.flush())
+
+		case CompressionTypes.LZMA:
+			with lzma.open(filepath, 'wt') as file:
+				file.writelines(chunks)
+
+# Yields the text of a save in chunks, compressed saves are detected from their first bytes and decompressed while reading
+def read_save(filepath, chunk_size=1 << 16):
+	with open(filepath, 'rb') as file:
+		header = file.read(6)
+		file.seek(0)
+
+		decoder = codecs.getincrementaldecoder("utf-8")()
+
+		if header.startswith(c_lzma_magic):
+			with lzma.open(file, 'rb') as stream:
+				while chunk := stream.read(chunk_size):
+					yield decoder.decode(chunk)
+
+		elif header.startswith(b"\x78"):
+			decompressor = zlib.decompressobj()
+
+			while chunk := file.read(chunk_size):
+				yield decoder.decode(decompressor.decompress(chunk))
+
+			yield decoder.decode(decompressor.flush())
+
+		else:
+			while chunk := file.read(chunk_size):
+				yield decoder.decode(chunk)
+
+		yield decoder.decode(b"", final=True)
+
+
+# <MAGIC> <VERSION> <BLOCK-COUNT> <WIRE-COUNT> <AUGMENT-BYTES>, followed by 8 byte aligned columns:
+# types (u8), states (u8), positions (3 x f32), wire offsets (i64, CSR), wire targets (i64), augments (';' separated text)
+c_binary_header = struct.Struct("<4sIQQQ")
+c_binary_magic = b"CM2B"
+c_binary_version = 1
+
+def _binary_columns(blocks, wires, augment_size):
+	return [
+		("types", np.uint8, (blocks,)),
+		("states", np.uint8, (blocks,)),
+		("positions", np.dtype("<f4"), (blocks, 3)),
+		("offsets", np.dtype("<i8"), (blocks + 1,)),
+		("targets", np.dtype("<i8"), (wires,)),
+		("augments", np.uint8, (augment_size,))
+	]
+
+def is_binary_save(filepath):
+	with open(filepath, 'rb') as file:
+		return file.read(len(c_binary_magic)) == c_binary_magic
+
+
+# Reverse Cuthill-McKee order of an undirected graph given as (E, 2) zero based edges, wired nodes end up close to each other.
+# Nodes without wires are placed last so they do not push the indices of wired ones up.
+def cuthill_mckee_order(size, edges):
+	edges = np.concatenate((edges, edges[:, ::-1]))
+	degree = np.bincount(edges[:, 0], minlength=size)
+
+	# Neighbors are visited from the least to the most connected one
+	edges = edges[np.lexsort((degree[edges[:, 1]], edges[:, 0]))]
+	offsets = np.concatenate(([0], np.cumsum(degree))).tolist()
+	neighbors = edges[:, 1].tolist()
+
+	explored = np.zeros(size, bool)
+	order = []
+
+	for root in np.argsort(degree, kind="stable").tolist():
+		if explored[root] or degree[root] == 0:
+			continue
+
+		explored[root] = True
+		start = len(order)
+		order.append(root)
+
+		while start < len(order):
+			node = order[start]
+			start += 1
+
+			for subnode in neighbors[offsets[node]:offsets[node + 1]]:
+				if not explored[subnode]:
+					explored[subnode] = True
+					order.append(subnode)
+
+	order.reverse()
+
+	return np.concatenate((np.array(order, np.int64), np.flatnonzero(degree == 0)))
+
+# Size in bytes of the wire section for (E, 2) one based edges
+def wire_section_size(edges):
+	if len(edges) <= 0:
+		return 0
+
+	digits = np.floor(np.log10(edges)).astype(np.int64) + 1
+	return int(digits.sum()) + 2 * len(edges) - 1
+
+
+def _serialize_chunk(blocks, wires, optimize_blocks, round_positions):
+	serialized_blocks = [
+		_format_block(block_type, state, _build_position(position, round_positions), augment, optimize_blocks)
+		for (block_type, state, position, augment) in zip(blocks.types.tolist(), blocks.states.tolist(), blocks.positions.tolist(), blocks.augments.tolist())
+	]
+
+	return ";".join(serialized_blocks), ";".join(serialize_wire(a, b) for (a, b) in wires.tolist())
+
+
 class Creation:
 	components = []
+	wire_cache = None
 
 	def __init__(self, components=None):
 		if components is None:
 			components = []
 		self.components = components
+		self.wire_cache = None
 
 	def remove_component(self, component):
 		self.components.remove(component)
@@ -244,32 +574,155 @@ class Creation:
 	
 	def find_requirements(self, root, direction="outputs"):
 		unexplored = [(root, 0)]
-		explored = []
+		explored = {id(root)}
 		result = []
 
 		while len(unexplored):
 			(node, depth) = unexplored.pop()
 			
-			explored.append(node)
 			result.append((node, depth))
 
 			for subnode in node.__getattribute__(direction):
-				if subnode in explored:
+				if id(subnode) in explored:
 					continue
 				
+				# Marked when queued so a node can never be queued twice
+				explored.add(id(subnode))
 				unexplored.append((subnode, depth + 1))
-			
-			depth += 1
 
 		return result
 
-	def topological_sort(self, node, direction="outputs"):
-		pass
+	# Transitive fan-in ("inputs") or fan-out ("outputs") of a set of roots, roots included
+	def find_cone(self, roots, direction="inputs"):
+		explored = set()
+		unexplored = []
+
+		for root in roots:
+			if id(root) not in explored:
+				explored.add(id(root))
+				unexplored.append(root)
+
+		cone = []
+
+		while len(unexplored):
+			node = unexplored.pop()
+			cone.append(node)
+
+			for subnode in node.__getattribute__(direction):
+				if id(subnode) in explored:
+					continue
+
+				explored.add(id(subnode))
+				unexplored.append(subnode)
+
+		return cone
+
+	# Copies the cone of roots into a new Creation, connections leaving the cone are dropped
+	def extract_cone(self, roots, direction="inputs"):
+		cone = self.find_cone(roots, direction)
+		mapping = {id(node): node.clone() for node in cone}
+
+		for node in cone:
+			copy = mapping[id(node)]
+			copy.inputs = [mapping[id(i)] for i in node.inputs if id(i) in mapping]
+			copy.outputs = [mapping[id(o)] for o in node.outputs if id(o) in mapping]
+
+		return Creation(list(mapping.values()))
+
+	# Kahn's algorithm over the whole creation (or the cone reachable from node), edges into components whose type is in cut are ignored.
+	# Returns the (node, depth) pairs in topological order, depth being the longest path from a source, and the nodes left over by cycles.
+	def topological_sort(self, node=None, direction="outputs", cut=()):
+		nodes = self.components if node is None else [subnode for (subnode, _) in self.find_requirements(node, direction)]
+		members = {id(subnode): subnode for subnode in nodes}
+		cut = set(cut)
+
+		def edges(subnode):
+			for target in subnode.__getattribute__(direction):
+				if id(target) in members and target.type not in cut:
+					yield target
+
+		degree = dict.fromkeys(members, 0)
+
+		for subnode in members.values():
+			for target in edges(subnode):
+				degree[id(target)] += 1
+
+		depth = dict.fromkeys(members, 0)
+		ready = collections.deque(subnode for subnode in members.values() if degree[id(subnode)] == 0)
+		order = []
+
+		while len(ready):
+			subnode = ready.popleft()
+			order.append((subnode, depth[id(subnode)]))
+
+			for target in edges(subnode):
+				key = id(target)
+
+				depth[key] = max(depth[key], depth[id(subnode)] + 1)
+				degree[key] -= 1
+
+				if degree[key] == 0:
+					ready.append(target)
+
+		cyclic = [subnode for subnode in members.values() if degree[id(subnode)] > 0]
+
+		return order, cyclic
 	
 	def longest_topological_path(self, node, direction="outputs"):
 		[stack, _] = self.topological_sort(node, direction)
 		
-		return max([item[1] for item in stack])
+		return max([item[1] for item in stack], default=0)
+
+	# Logic depth of every endpoint (creation outputs and components of a cut type), sorted from the deepest one.
+	# Cutting flip flops turns register feedback loops into separate paths, anything still cyclic is returned alongside.
+	# Endpoints are (endpoint, depth, parent) and parents maps id(node) to the node before it on its deepest path,
+	# which keeps the report O(V + E). Paths are built on request with trace_path, e.g. for the deepest few endpoints.
+	def critical_paths(self, cut=(ComponentTypes.FLIPFLOP,)):
+		[order, cyclic] = self.topological_sort(cut=cut)
+		depths = {id(node): depth for (node, depth) in order}
+		parents = {}
+		arrivals = {}
+
+		for (node, depth) in order:
+			for target in node.outputs:
+				key = id(target)
+
+				if key not in depths:
+					continue
+
+				if target.type in cut:
+					if key not in arrivals or arrivals[key][0] < depth + 1:
+						arrivals[key] = (depth + 1, node)
+				elif key not in parents and depths[key] == depth + 1:
+					parents[key] = node
+
+		endpoints = []
+
+		for endpoint in self.get_outputs():
+			key = id(endpoint)
+
+			if key in depths and endpoint.type not in cut:
+				endpoints.append((endpoint, depths[key], parents.get(key)))
+
+		for (node, _) in order:
+			if id(node) in arrivals:
+				(depth, parent) = arrivals[id(node)]
+				endpoints.append((node, depth, parent))
+
+		endpoints.sort(key=lambda item: item[1], reverse=True)
+
+		return endpoints, parents, cyclic
+
+	# Deepest path into an endpoint returned by critical_paths, from its start to the endpoint
+	@staticmethod
+	def trace_path(endpoint, parent, parents):
+		path = [endpoint]
+
+		while parent is not None:
+			path.append(parent)
+			parent = parents.get(id(parent))
+
+		return path[::-1]
 
 	def make_connection(self, source, target):
 		assert source in self.components, "Source component not in self.components"
@@ -281,81 +734,601 @@ class Creation:
 	def bridge_connections(self):
 		changes = 0
 
+		# Lazily built id sets mirroring each visited node's inputs/outputs, kept in sync as links are added
+		linked_inputs = {}
+		linked_outputs = {}
+
+		def linked(table, node, direction):
+			key = id(node)
+
+			if key not in table:
+				table[key] = set(map(id, node.__getattribute__(direction)))
+
+			return table[key]
+
 		for component in self.components:
+			key = id(component)
+
 			for i in component.inputs:
-				if component in i.outputs:
+				outputs = linked(linked_outputs, i, "outputs")
+
+				if key in outputs:
 					continue
 
 				i.outputs.append(component)
+				outputs.add(key)
 				changes += 1
 
 			for o in component.outputs:
-				if component in o.inputs:
+				inputs = linked(linked_inputs, o, "inputs")
+
+				if key in inputs:
 					continue
 
 				o.inputs.append(component)
+				inputs.add(key)
 				changes += 1
 
 		return changes
 	
+	# Reorders components to shrink the save without changing the circuit, returns the size in bytes of the plain wire
+	# section before and after. DEGREE targets plain saves and keeps the current order when it would not shrink them,
+	# LOCALITY targets delta encoded and compressed saves and is always applied.
+	def reorder_components(self, ordering=OrderingTypes.DEGREE):
+		self.deduplicate_components()
+
+		components = self.components
+		index_map = {id(component): idx for idx, component in enumerate(components)}
+		edges = []
+
+		for idx, component in enumerate(components):
+			edges += [(index_map[id(i)], idx) for i in component.inputs]
+			edges += [(idx, index_map[id(o)]) for o in component.outputs]
+
+		edges = np.unique(np.array(edges, np.int64).reshape(-1, 2), axis=0)
+
+		match ordering:
+			case OrderingTypes.LOCALITY:
+				order = cuthill_mckee_order(len(components), edges)
+
+			case OrderingTypes.DEGREE:
+				order = np.argsort(-np.bincount(edges.ravel(), minlength=len(components)), kind="stable")
+
+		position = np.empty(len(components), np.int64)
+		position[order] = np.arange(len(components))
+
+		before = wire_section_size(edges + 1)
+		after = wire_section_size(position[edges] + 1)
+
+		if ordering == OrderingTypes.DEGREE and after >= before:
+			return before, before
+
+		components[:] = [components[idx] for idx in order.tolist()]
+
+		return before, after
+
 	def deduplicate_components(self):
 		components = self.components
 		size = len(components)
-		seen = []
+		seen = set()
+		unique = []
 
 		for component in components:
-			if component in seen:
-				components.remove(component)
-			else:
-				seen.append(component)
-		
-		return size - len(seen)
+			if id(component) in seen:
+				continue
 
-	def serialize(self, optimize_wires=True, optimize_blocks=True, round_positions=True):
-		serialized_wires = ""
-		serialized_components = ""
+			seen.add(id(component))
+			unique.append(component)
 		
-		connection_list = set()
+		components[:] = unique
+
+		return size - len(unique)
+
+	def serialize_wires(self, optimize_wires=True):
 		components = self.components
 
-		# Generates a connection between two points if it does not already exist in the connection list.
-		def serialize_connection(a, b):
-			if optimize_wires:
-				connection = ((b + 1) << 32) | ((a + 1) << 0)
+		# The wire section only depends on the component order and on who is connected to whom
+		signature = (optimize_wires, [(id(component), tuple(map(id, component.inputs)), tuple(map(id, component.outputs))) for component in components])
+
+		if self.wire_cache is not None and self.wire_cache[0] == signature:
+			return self.wire_cache[1]
+
+		connection_list = set()
+		serialized = []
+
+		# Built once per call so wire endpoints resolve in O(1) instead of components.index()
+		index_map = {id(component): idx for idx, component in enumerate(components, 1)}
+
+		for src, component in enumerate(components, 1):
+			wires = [(index_map[id(i)], src) for i in component.inputs] # i -> src
+			wires += [(src, index_map[id(o)]) for o in component.outputs] # src -> o
+
+			for (a, b) in wires:
+				# Skips connections that were already emitted
+				if optimize_wires:
+					connection = (b << 32) | (a << 0)
+
+					if connection in connection_list:
+						continue
 
-				if connection not in connection_list:
 					connection_list.add(connection)
-				else:
-					return ''
-			
-			return serialize_wire(a + 1, b + 1) + ';'
+
+				serialized.append(serialize_wire(a, b))
+
+		self.wire_cache = (signature, ";".join(serialized))
+
+		return self.wire_cache[1]
+
+	# Block fragments are cached on each component and the wire section on the creation, so repeated calls only
+	# redo the work for what changed since the last one
+	def serialize_iter(self, optimize_wires=True, optimize_blocks=True, round_positions=True):
+		components = self.components
 
 		self.deduplicate_components()
 
-		for src, component in enumerate(components):
-			serialized_components += serialize_block(component, optimize_blocks, round_positions) + ';'
-			
-			for i in component.inputs:
-				serialized_wires += serialize_connection(components.index(i), src) # i -> src
+		for idx, component in enumerate(components):
+			yield (idx and ';' or '') + component.fragment(optimize_blocks, round_positions)
 
-			for o in component.outputs:
-				serialized_wires += serialize_connection(src, components.index(o)) # src -> o
-		
-		return f"{serialized_components[:-1]}?{serialized_wires[:-1]}??" # @todo Customs
+		yield '?'
+		yield self.serialize_wires(optimize_wires)
+		yield "??" # @todo Customs
+
+	# Same output as serialize, blocks and wires are formatted in chunks by a process pool.
+	# Wire endpoints and duplicates are resolved up front with NumPy, chunks are sent as CreationArrays columns and
+	# edge array slices so every one of them can be formatted on its own without pickling components.
+	def serialize_parallel(self, workers=None, chunk_size=1 << 16, optimize_wires=True, optimize_blocks=True, round_positions=True):
+		components = self.components
+		size = len(components)
+
+		self.deduplicate_components()
+
+		# Endpoints are found by looking up their ids in the sorted ids of all components
+		ids = np.fromiter(map(id, components), np.uint64, size)
+		order = np.argsort(ids)
+		sorted_ids = ids[order]
+
+		def resolve(connections):
+			lists = list(map(operator.attrgetter(connections), components))
+			counts = np.fromiter(map(len, lists), np.int64, size)
+			endpoints = np.fromiter(map(id, itertools.chain.from_iterable(lists)), np.uint64, int(counts.sum()))
+			found = np.minimum(np.searchsorted(sorted_ids, endpoints), max(size - 1, 0))
+
+			if not np.array_equal(sorted_ids[found], endpoints):
+				raise KeyError("Connection to a component outside of the creation")
+
+			return np.repeat(np.arange(1, size + 1), counts), order[found] + 1
+
+		[input_sources, inputs] = resolve("inputs")
+		[output_sources, outputs] = resolve("outputs")
+
+		# Per component its inputs (i -> src) and then its outputs (src -> o), the order the serial path emits them in
+		wires = np.concatenate((np.stack((inputs, input_sources), axis=1), np.stack((output_sources, outputs), axis=1)))
+		wires = wires[np.argsort(np.concatenate((2 * input_sources, 2 * output_sources + 1)), kind="stable")]
+
+		# Keeps the first occurrence of every connection, which is the one the serial path emits
+		if optimize_wires and len(wires) > 0:
+			[_, first] = np.unique((wires[:, 1] << 32) | wires[:, 0], return_index=True)
+			wires = wires[np.sort(first)]
+
+		# Positions are kept as float64, which formats the same as the values they came from
+		blocks = CreationArrays(
+			np.fromiter(map(operator.attrgetter("_type.value"), components), np.uint8, size),
+			np.fromiter(map(operator.attrgetter("_state.value"), components), np.uint8, size),
+			np.fromiter(itertools.chain.from_iterable(map(operator.attrgetter("_position"), components)), np.float64, 3 * size).reshape(size, 3),
+			np.array([component._augments and _build_augments(component._augments, component._type) or '' for component in components], object)
+		)
+		chunks = range(0, max(size, len(wires)), chunk_size)
+
+		with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+			results = list(executor.map(
+				_serialize_chunk,
+				[CreationArrays(*(column[start:start + chunk_size] for column in [blocks.types, blocks.states, blocks.positions, blocks.augments])) for start in chunks],
+				[wires[start:start + chunk_size] for start in chunks],
+				[optimize_blocks] * len(chunks),
+				[round_positions] * len(chunks)
+			))
+
+		serialized_blocks = ";".join(result[0] for result in results if len(result[0]) > 0)
+		serialized_wires = ";".join(result[1] for result in results if len(result[1]) > 0)
+
+		return f"{serialized_blocks}?{serialized_wires}??" # @todo Customs
+
+	# Drops cached fragments to free their memory, changes to the components are noticed without it
+	def invalidate(self, components=None):
+		for component in components if components is not None else self.components:
+			component._fragment = None
+
+		self.wire_cache = None
+
+	def serialize(self, optimize_wires=True, optimize_blocks=True, round_positions=True):
+		return "".join(self.serialize_iter(optimize_wires, optimize_blocks, round_positions))
 	
 	def deserialize(self, string, clear=True):
+		self.deserialize_stream([string], clear)
+
+	def deserialize_stream(self, source, clear=True, chunk_size=1 << 16):
 		clear and self.clear()
 
-		[components, connections, _customs, *_] = [part.split(';') for part in string.split('?')]
+		for section, token in scan_save(source, chunk_size):
+			match section:
+				case SaveSections.BLOCKS:
+					self.add_component(deserialize_block(token))
 
-		for component in components:
-			self.add_component(deserialize_block(component))
-		
-		for connection in connections:
-			deserialize_wire(connection, self.components)
+				case SaveSections.WIRES:
+					deserialize_wire(token, self.components)
 
-	def deserialize_file(self, filepath, clear=True):
-		self.deserialize(pathlib.Path(filepath).read_text(), clear)
+				case SaveSections.CUSTOMS:
+					break # @todo Customs
+
+	def deserialize_file(self, filepath, clear=True, cache=True):
+		# The cache rebuilds a standalone creation, so it is only used when nothing has to be kept
+		if cache and clear and parse_cache is not None:
+			self.components[:] = parse_cache.load(filepath).to_creation().components
+			return
+
+		self.deserialize_stream(read_save(filepath), clear)
 	
-	def serialize_file(self, filepath, **kwargs):
-		pathlib.Path(filepath).write_text(self.serialize(**kwargs))
+	def serialize_file(self, filepath, compression=CompressionTypes.NONE, delta_wires=False, **kwargs):
+		write_save(filepath, self.serialize_iter(**kwargs), compression, delta_wires)
+
+	def save_binary(self, filepath):
+		CreationArrays().from_creation(self).save_binary(filepath)
+
+	def load_binary(self, filepath, clear=True):
+		creation = CreationArrays().load_binary(filepath).to_creation()
+
+		clear and self.clear()
+		self.add_components(creation.components)
+
+
+# Columnar form of a Creation, blocks are stored as parallel arrays and wires as a CSR edge index (offsets into targets, indexed by source).
+# Augments are kept in their serialized form so conversions are lossless without materializing per-block objects.
+# When the wires come from a save, wire_order holds the CSR position of every wire in save order so the adjacency
+# lists of to_creation are rebuilt exactly like parsing the text would.
+class CreationArrays:
+	def __init__(self, types=None, states=None, positions=None, augments=None, offsets=None, targets=None, wire_order=None):
+		self.types = np.zeros(0, np.uint8) if types is None else types
+		self.states = np.zeros(0, np.uint8) if states is None else states
+		self.positions = np.zeros((0, 3), np.float32) if positions is None else positions
+		self.augments = np.full(len(self.types), '', object) if augments is None else augments
+		self.offsets = np.zeros(len(self.types) + 1, np.int64) if offsets is None else offsets
+		self.targets = np.zeros(0, np.int64) if targets is None else targets
+		self.wire_order = wire_order
+
+	def __len__(self):
+		return len(self.types)
+
+	def clear(self):
+		self.__init__()
+
+	# Augments skipped by load_binary are None, writing defaults in their place would silently lose them
+	def _loaded_augments(self):
+		if self.augments is None:
+			raise ValueError("Augments were not loaded (load_binary with load_augments=False)")
+
+		return self.augments
+
+	def get_augments(self, idx):
+		block_type = ComponentTypes(int(self.types[idx]))
+		return tuple(_parse_augments(self._loaded_augments()[idx], block_type)) or default_augments[block_type]
+
+	def get_edges(self):
+		sources = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.offsets))
+		return np.stack([sources, self.targets], axis=1)
+
+	def set_edges(self, sources, targets, unique=False):
+		sources = np.asarray(sources, np.int64)
+		targets = np.asarray(targets, np.int64)
+		size = len(self)
+
+		if unique:
+			[sources, targets] = np.divmod(np.unique(sources * size + targets), max(size, 1))
+			self.wire_order = None
+		else:
+			order = np.argsort(sources, kind="stable")
+			[sources, targets] = [sources[order], targets[order]]
+
+			self.wire_order = np.empty(len(order), np.int64)
+			self.wire_order[order] = np.arange(len(order))
+
+		self.offsets = np.zeros(size + 1, np.int64)
+		np.cumsum(np.bincount(sources, minlength=size), out=self.offsets[1:])
+		self.targets = targets
+
+	# Keeps the given component indices (in that order) and the wires between them
+	def subset(self, nodes):
+		nodes = np.asarray(nodes, np.int64)
+		local = np.full(len(self), -1, np.int64)
+		local[nodes] = np.arange(len(nodes))
+
+		edges = local[self.get_edges()]
+		edges = edges[(edges >= 0).all(axis=1)]
+
+		result = CreationArrays(self.types[nodes], self.states[nodes], self.positions[nodes], None if self.augments is None else self.augments[nodes])
+		result.set_edges(edges[:, 0], edges[:, 1])
+
+		if self.augments is None:
+			result.augments = None
+
+		return result
+
+	def from_creation(self, creation):
+		components = creation.components
+		size = len(components)
+		index_map = {id(component): idx for idx, component in enumerate(components)}
+
+		self.types = np.fromiter((component.type.value for component in components), np.uint8, size)
+		self.states = np.fromiter((component.state.value for component in components), np.uint8, size)
+		self.positions = np.array([component._position for component in components], np.float32).reshape(size, 3)
+		self.augments = np.array([_build_augments(component.augments, component.type) for component in components], object)
+
+		sources = array.array('q')
+		targets = array.array('q')
+
+		for idx, component in enumerate(components):
+			for i in component.inputs:
+				sources.append(index_map[id(i)])
+				targets.append(idx)
+
+			for o in component.outputs:
+				sources.append(idx)
+				targets.append(index_map[id(o)])
+
+		self.set_edges(sources, targets, unique=True)
+
+		return self
+
+	def to_creation(self):
+		types = {block_type.value: block_type for block_type in ComponentTypes}
+		states = {state.value: state for state in StateTypes}
+
+		components = [
+			Component(
+				type=types[block_type],
+				state=states[state],
+				position=tuple(position),
+				augments=augment and tuple(_parse_augments(augment, types[block_type]))
+			)
+			for block_type, state, position, augment in zip(self.types.tolist(), self.states.tolist(), self.positions.tolist(), self._loaded_augments().tolist())
+		]
+
+		edges = self.get_edges()
+
+		if self.wire_order is not None:
+			edges = edges[self.wire_order]
+
+		for [source, target] in edges.tolist():
+			components[source].outputs.append(components[target])
+			components[target].inputs.append(components[source])
+
+		return Creation(components)
+
+	def serialize_iter(self, optimize_wires=True, optimize_blocks=True, round_positions=True):
+		blocks = zip(self.types.tolist(), self.states.tolist(), self.positions.tolist(), self._loaded_augments().tolist())
+
+		for idx, (block_type, state, position, augment) in enumerate(blocks):
+			yield (idx and ';' or '') + _format_block(block_type, state, _build_position(position, round_positions), augment, optimize_blocks)
+
+		yield '?'
+
+		edges = self.get_edges()
+
+		if optimize_wires:
+			edges = np.unique(edges, axis=0)
+
+		for idx, [source, target] in enumerate((edges + 1).tolist()):
+			yield (idx and ';' or '') + serialize_wire(source, target)
+
+		yield "??" # @todo Customs
+
+	def serialize(self, optimize_wires=True, optimize_blocks=True, round_positions=True):
+		return "".join(self.serialize_iter(optimize_wires, optimize_blocks, round_positions))
+
+	def deserialize(self, string):
+		return self.deserialize_stream([string])
+
+	def deserialize_stream(self, source, chunk_size=1 << 16, batch_size=1 << 16, dtype=np.float32):
+		blocks = []
+		wires = []
+
+		block_columns = []
+		wire_columns = []
+
+		for section, token in scan_save(source, chunk_size):
+			match section:
+				case SaveSections.BLOCKS:
+					blocks.append(token)
+
+					if len(blocks) >= batch_size:
+						block_columns.append(parse_blocks(blocks, dtype))
+						blocks.clear()
+
+				case SaveSections.WIRES:
+					wires.append(token)
+
+					if len(wires) >= batch_size:
+						wire_columns.append(parse_wires(wires))
+						wires.clear()
+
+				case SaveSections.CUSTOMS:
+					break # @todo Customs
+
+		block_columns.append(parse_blocks(blocks, dtype))
+		wire_columns.append(parse_wires(wires))
+
+		[types, states, positions, augments] = [np.concatenate(column) for column in zip(*block_columns)]
+		[sources, targets] = [np.concatenate(column) for column in zip(*wire_columns)]
+
+		self.types = types
+		self.states = states
+		self.positions = positions
+		self.augments = augments
+		self.set_edges(sources, targets)
+
+		return self
+
+	def deserialize_file(self, filepath, cache=True):
+		if cache and parse_cache is not None:
+			arrays = parse_cache.load(filepath)
+			arrays.positions = arrays.positions.astype(np.float32)
+
+			self.__dict__.update(arrays.__dict__)
+			return self
+
+		return self.deserialize_stream(read_save(filepath))
+
+	def serialize_file(self, filepath, compression=CompressionTypes.NONE, delta_wires=False, **kwargs):
+		write_save(filepath, self.serialize_iter(**kwargs), compression, delta_wires)
+
+	def save_binary(self, filepath):
+		augments = ";".join(self._loaded_augments().tolist()).encode()
+		columns = {
+			"types": self.types,
+			"states": self.states,
+			"positions": self.positions,
+			"offsets": self.offsets,
+			"targets": self.targets,
+			"augments": np.frombuffer(augments, np.uint8)
+		}
+
+		with open(filepath, 'wb') as file:
+			file.write(c_binary_header.pack(c_binary_magic, c_binary_version, len(self), len(self.targets), len(augments)))
+
+			for (name, dtype, shape) in _binary_columns(len(self), len(self.targets), len(augments)):
+				file.write(b"\0" * (-file.tell() % 8))
+				file.write(np.ascontiguousarray(columns[name], dtype).reshape(shape).tobytes())
+
+	# Columns are memory-mapped (read-only) instead of read, augments are only decoded when load_augments is set
+	def load_binary(self, filepath, load_augments=True):
+		data = np.memmap(filepath, np.uint8, 'r')
+		[magic, version, blocks, wires, augment_size] = c_binary_header.unpack(data[:c_binary_header.size].tobytes())
+
+		assert magic == c_binary_magic, "Not a binary CircuitMaker save"
+		assert version == c_binary_version, f"Unsupported binary save version {version}"
+
+		position = c_binary_header.size
+		columns = {}
+
+		for (name, dtype, shape) in _binary_columns(blocks, wires, augment_size):
+			position += -position % 8
+			size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+
+			columns[name] = data[position:position + size].view(dtype).reshape(shape)
+			position += size
+
+		augments = None
+
+		if load_augments:
+			augments = np.array(columns["augments"].tobytes().decode().split(';') if blocks > 0 else [], object)
+
+		self.__init__(columns["types"], columns["states"], columns["positions"], augments, columns["offsets"], columns["targets"])
+		self.augments = augments
+
+		return self
+
+
+# On-disk cache of parsed saves keyed by a hash of their content, entries are CreationArrays snapshots stored as .npz files.
+# Positions are kept as float64 and wires in save order so loading through the cache gives the same creation as parsing the text.
+# Least recently used entries are evicted once the directory grows past max_size bytes.
+# The cache is best effort, an unusable directory or a damaged entry falls back to parsing the save.
+class ParseCache:
+	def __init__(self, directory, max_size=1 << 30):
+		self.directory = pathlib.Path(directory)
+		self.max_size = max_size
+
+	def key(self, filepath):
+		digest = hashlib.blake2b(digest_size=16)
+		digest.update(c_cache_version.to_bytes(4, "little"))
+
+		with open(filepath, 'rb') as file:
+			while chunk := file.read(1 << 20):
+				digest.update(chunk)
+
+		return digest.hexdigest()
+
+	def load(self, filepath):
+		entry = self.directory / f"{self.key(filepath)}.npz"
+
+		try:
+			if entry.exists():
+				arrays = self.read(entry)
+				os.utime(entry)
+
+				return arrays
+		except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+			with contextlib.suppress(OSError):
+				entry.unlink()
+
+		arrays = CreationArrays().deserialize_stream(read_save(filepath), dtype=np.float64)
+
+		with contextlib.suppress(OSError):
+			self.write(entry, arrays)
+			self.evict()
+
+		return arrays
+
+	def read(self, entry):
+		with np.load(entry) as snapshot:
+			size = len(snapshot["types"])
+			augments = snapshot["augments"].tobytes().decode().split(';') if size > 0 else []
+
+			return CreationArrays(
+				snapshot["types"],
+				snapshot["states"],
+				snapshot["positions"],
+				np.array(augments, object),
+				snapshot["offsets"],
+				snapshot["targets"],
+				snapshot["wire_order"]
+			)
+
+	# Every writer uses its own temporary file, the finished entry is moved in place atomically
+	def write(self, entry, arrays):
+		self.directory.mkdir(parents=True, exist_ok=True)
+		wire_order = arrays.wire_order if arrays.wire_order is not None else np.arange(len(arrays.targets))
+
+		with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as file:
+			temporary = file.name
+
+		try:
+			with open(temporary, 'wb') as file:
+				np.savez(
+					file,
+					types=arrays.types,
+					states=arrays.states,
+					positions=arrays.positions,
+					augments=np.frombuffer(";".join(arrays.augments.tolist()).encode(), np.uint8),
+					offsets=arrays.offsets,
+					targets=arrays.targets,
+					wire_order=wire_order
+				)
+
+			os.replace(temporary, entry)
+		except BaseException:
+			with contextlib.suppress(OSError):
+				os.unlink(temporary)
+
+			raise
+
+	def evict(self):
+		entries = sorted(self.directory.glob("*.npz"), key=lambda entry: entry.stat().st_mtime)
+		total = sum(entry.stat().st_size for entry in entries)
+
+		for entry in entries[:-1]:
+			if total <= self.max_size:
+				break
+
+			total -= entry.stat().st_size
+			entry.unlink()
+
+	def clear(self):
+		for entry in self.directory.glob("*.npz"):
+			entry.unlink()
+
+
+c_cache_directory = pathlib.Path.home() / ".cache" / "CircuitMaker2-Utils"
+c_cache_size = 1 << 30
+c_cache_version = 2 # Part of every key, bumped whenever the layout of the entries changes
+
+# Set to None to always parse saves from scratch
+parse_cache = ParseCache(c_cache_directory, c_cache_size)
@@ -0,0 +1,574 @@
+import multiprocessing
+import collections
+import numpy as np
+
+from multiprocessing import shared_memory
+
+import CircuitMaker as CM
+
+
+# Types that are not listed here behave like an OR gate (nodes, LEDs, conductors, ...)
+c_gate_groups = {
+	"nor": CM.ComponentTypes.GATE_NOR,
+	"and": CM.ComponentTypes.GATE_AND,
+	"xor": CM.ComponentTypes.GATE_XOR,
+	"nand": CM.ComponentTypes.GATE_NAND,
+	"xnor": CM.ComponentTypes.GATE_XNOR,
+	"flipflop": CM.ComponentTypes.FLIPFLOP,
+	"button": CM.ComponentTypes.BUTTON,
+	"delay": CM.ComponentTypes.DELAY,
+	"antenna": CM.ComponentTypes.ANTENNA,
+}
+
+# Tick based simulator, every component computes its next state from the states its inputs had on the previous tick
+class Simulator:
+	def __init__(self, creation):
+		self.index_map = {}
+
+		if isinstance(creation, CM.Creation):
+			self.index_map = {id(component): idx for idx, component in enumerate(creation.components)}
+			creation = CM.CreationArrays().from_creation(creation)
+
+		self.arrays = creation
+		self.compile()
+
+	def compile(self):
+		arrays = self.arrays
+		size = len(arrays)
+		[sources, targets] = arrays.get_edges().T
+
+		# Edges grouped by target, input counts are then differences of a running sum over the source states
+		self.sources = sources[np.argsort(targets, kind="stable")]
+		self.degree = np.bincount(targets, minlength=size)
+		self.input_offsets = np.concatenate(([0], np.cumsum(self.degree)))
+		self.input_totals = np.zeros(len(sources) + 1, np.int64)
+
+		self.size = size
+		self.ticks = 0
+		self.state = arrays.states.astype(bool)
+		self.groups = {name: np.flatnonzero(arrays.types == block_type.value) for name, block_type in c_gate_groups.items()}
+
+		# Buttons (and anything driven through set_input) keep their state between ticks
+		self.held = np.zeros(size, bool)
+		self.held[self.groups["button"]] = True
+
+		self.flipflop_inputs = self.input_counts()[self.groups["flipflop"]] > 0
+
+		delays = self.groups["delay"]
+		self.delay_lengths = np.array([max(int(arrays.get_augments(idx)[0]) - 1, 0) for idx in delays], np.int64)
+		self.delay_buffer = np.zeros((len(delays), max(self.delay_lengths.max(initial=0), 1)), bool)
+
+		antennas = self.groups["antenna"]
+		[channels, self.antenna_channels] = np.unique([int(arrays.get_augments(idx)[0]) for idx in antennas], return_inverse=True)
+		self.channel_count = len(channels)
+
+	def index(self, component):
+		return self.index_map[id(component)] if isinstance(component, CM.Component) else int(component)
+
+	def input_counts(self):
+		totals = self.input_totals
+		np.cumsum(self.state[self.sources], out=totals[1:])
+
+		return totals[self.input_offsets[1:]] - totals[self.input_offsets[:-1]]
+
+	def tick(self):
+		state = self.state
+		groups = self.groups
+
+		counts = self.input_counts()
+		active = counts > 0
+		complete = active & (counts == self.degree)
+
+		next_state = active.copy()
+
+		g = groups["nor"]
+		next_state[g] = ~active[g]
+
+		g = groups["and"]
+		next_state[g] = complete[g]
+
+		g = groups["nand"]
+		next_state[g] = ~complete[g]
+
+		g = groups["xor"]
+		next_state[g] = (counts[g] & 1) == 1
+
+		g = groups["xnor"]
+		next_state[g] = (counts[g] & 1) == 0
+
+		# Flip flops toggle on the rising edge of their inputs
+		g = groups["flipflop"]
+		next_state[g] = state[g] ^ (active[g] & ~self.flipflop_inputs)
+		self.flipflop_inputs = active[g]
+
+		g = groups["delay"]
+		rows = np.arange(len(g))
+		slots = self.ticks % np.maximum(self.delay_lengths, 1)
+		next_state[g] = np.where(self.delay_lengths > 0, self.delay_buffer[rows, slots], active[g])
+		self.delay_buffer[rows, slots] = active[g]
+
+		# Every antenna on a channel receives whatever any antenna on that channel transmits
+		g = groups["antenna"]
+		channels = np.bincount(self.antenna_channels[active[g]], minlength=self.channel_count) > 0
+		next_state[g] = channels[self.antenna_channels]
+
+		next_state[self.held] = state[self.held]
+
+		self.state = next_state
+		self.ticks += 1
+
+	def step(self, ticks=1):
+		for _ in range(ticks):
+			self.tick()
+
+		return self.state
+
+	def set_input(self, component, value, hold=True):
+		idx = self.index(component)
+
+		self.state[idx] = bool(value)
+		self.held[idx] = hold
+
+	def set_inputs(self, components, values, hold=True):
+		for component, value in zip(components, values):
+			self.set_input(component, value, hold)
+
+	def release(self, component):
+		idx = self.index(component)
+		self.held[idx] = self.arrays.types[idx] == CM.ComponentTypes.BUTTON.value
+
+	def get_state(self, component):
+		return bool(self.state[self.index(component)])
+
+	def probe(self, components):
+		return self.state[[self.index(component) for component in components]]
+
+# Bit parallel variant of Simulator, every component holds `words` uint64 words so each tick advances 64 * words independent vectors
+class BatchSimulator(Simulator):
+	def __init__(self, creation, words=1):
+		self.words = words
+		super().__init__(creation)
+
+	def compile(self):
+		super().compile()
+
+		words = self.words
+		nonempty = self.degree > 0
+
+		self.vectors = 64 * words
+		self.input_targets = np.flatnonzero(nonempty)
+		self.input_starts = self.input_offsets[:-1][nonempty]
+
+		self.state = self.broadcast(self.state)
+		self.flipflop_inputs = self.broadcast(self.flipflop_inputs)
+		self.delay_buffer = np.zeros((*self.delay_buffer.shape, words), np.uint64)
+
+	def broadcast(self, flags):
+		return np.where(flags[:, None], ~np.uint64(0), np.uint64(0)) * np.ones(self.words, np.uint64)
+
+	def pack(self, value):
+		bits = np.broadcast_to(np.asarray(value, bool), (self.vectors,))
+		return np.packbits(bits, bitorder="little").view(np.uint64)
+
+	def unpack(self, words):
+		return np.unpackbits(np.ascontiguousarray(words).view(np.uint8), axis=-1, bitorder="little").astype(bool)
+
+	def reduce_inputs(self, operation, gathered):
+		result = np.zeros((self.size, self.words), np.uint64)
+
+		if len(self.input_starts) > 0:
+			result[self.input_targets] = operation.reduceat(gathered, self.input_starts, axis=0)
+
+		return result
+
+	def tick(self):
+		state = self.state
+		groups = self.groups
+
+		gathered = state[self.sources]
+		active = self.reduce_inputs(np.bitwise_or, gathered)
+		next_state = active.copy()
+
+		g = groups["nor"]
+		next_state[g] = ~active[g]
+
+		if len(groups["and"]) + len(groups["nand"]) > 0:
+			complete = self.reduce_inputs(np.bitwise_and, gathered)
+
+			g = groups["and"]
+			next_state[g] = complete[g]
+
+			g = groups["nand"]
+			next_state[g] = ~complete[g]
+
+		if len(groups["xor"]) + len(groups["xnor"]) > 0:
+			parity = self.reduce_inputs(np.bitwise_xor, gathered)
+
+			g = groups["xor"]
+			next_state[g] = parity[g]
+
+			g = groups["xnor"]
+			next_state[g] = ~parity[g]
+
+		g = groups["flipflop"]
+		next_state[g] = state[g] ^ (active[g] & ~self.flipflop_inputs)
+		self.flipflop_inputs = active[g]
+
+		g = groups["delay"]
+		rows = np.arange(len(g))
+		slots = self.ticks % np.maximum(self.delay_lengths, 1)
+		next_state[g] = np.where((self.delay_lengths > 0)[:, None], self.delay_buffer[rows, slots], active[g])
+		self.delay_buffer[rows, slots] = active[g]
+
+		g = groups["antenna"]
+		channels = np.zeros((self.channel_count, self.words), np.uint64)
+		np.bitwise_or.at(channels, self.antenna_channels, active[g])
+		next_state[g] = channels[self.antenna_channels]
+
+		next_state[self.held] = state[self.held]
+
+		self.state = next_state
+		self.ticks += 1
+
+	# value is either a single bool applied to every vector or one bool per vector
+	def set_input(self, component, value, hold=True):
+		idx = self.index(component)
+
+		self.state[idx] = self.pack(value)
+		self.held[idx] = hold
+
+	# Drives components[bit] with that bit of each vector's integer value
+	def set_input_values(self, components, values, hold=True):
+		values = np.asarray(values, np.uint64)
+
+		for bit, component in enumerate(components):
+			self.set_input(component, (values >> np.uint64(bit)) & np.uint64(1), hold)
+
+	def get_state(self, component):
+		return self.unpack(self.state[self.index(component)])
+
+	def probe(self, components):
+		return self.unpack(self.state[[self.index(component) for component in components]])
+
+	def probe_values(self, components):
+		bits = self.probe(components).astype(np.uint64)
+		return (bits << np.arange(len(components), dtype=np.uint64)[:, None]).sum(axis=0, dtype=np.uint64)
+
+# Event driven variant of Simulator, input counts are kept up to date incrementally and only the fan-out of components
+# that changed on the previous tick gets evaluated (delays and antennas are always evaluated as they carry their own state)
+class EventSimulator(Simulator):
+	def compile(self):
+		super().compile()
+
+		arrays = self.arrays
+		types = arrays.types
+
+		self.types = types
+		self.output_offsets = arrays.offsets
+		self.output_targets = arrays.targets
+		self.counts = self.input_counts()
+		self.flipflop_inputs = self.counts > 0
+
+		self.always = np.concatenate((self.groups["delay"], self.groups["antenna"]))
+		self.evaluated = np.ones(self.size, bool)
+		self.evaluated[self.always] = False
+
+		# Everything is evaluated on the first tick since saved states might not match the inputs
+		self.pending = np.flatnonzero(self.evaluated)
+		self.last_evaluated = 0
+		self.last_changed = 0
+		self.total_evaluated = 0
+
+	def fanout(self, nodes):
+		starts = self.output_offsets[nodes]
+		lengths = self.output_offsets[nodes + 1] - starts
+		ends = np.cumsum(lengths)
+
+		positions = np.arange(ends[-1] if len(ends) > 0 else 0) + np.repeat(starts - (ends - lengths), lengths)
+		return self.output_targets[positions], lengths
+
+	def propagate(self, changed):
+		if len(changed) <= 0:
+			return
+
+		[targets, lengths] = self.fanout(changed)
+		delta = np.where(self.state[changed], 1, -1)
+
+		np.add.at(self.counts, targets, np.repeat(delta, lengths))
+		self.pending = np.union1d(self.pending, targets)
+
+	def evaluate(self, nodes):
+		T = CM.ComponentTypes
+
+		types = self.types[nodes]
+		counts = self.counts[nodes]
+		state = self.state[nodes]
+
+		active = counts > 0
+		complete = active & (counts == self.degree[nodes])
+		parity = (counts & 1) == 1
+
+		value = active.copy()
+
+		for block_type, result in (
+			(T.GATE_NOR, ~active),
+			(T.GATE_AND, complete),
+			(T.GATE_NAND, ~complete),
+			(T.GATE_XOR, parity),
+			(T.GATE_XNOR, ~parity),
+			(T.FLIPFLOP, state ^ (active & ~self.flipflop_inputs[nodes]))
+		):
+			mask = types == block_type.value
+			value[mask] = result[mask]
+
+		self.flipflop_inputs[nodes] = active
+
+		return value
+
+	def tick(self):
+		state = self.state
+		groups = self.groups
+
+		nodes = self.pending[self.evaluated[self.pending]]
+		value = self.evaluate(nodes)
+
+		held = self.held[nodes]
+		value[held] = state[nodes[held]]
+
+		# Only delays and antennas read their inputs every tick, the rest of the counts are left alone
+		g = groups["delay"]
+		active = self.counts[g] > 0
+		rows = np.arange(len(g))
+		slots = self.ticks % np.maximum(self.delay_lengths, 1)
+		delayed = np.where(self.delay_lengths > 0, self.delay_buffer[rows, slots], active)
+		self.delay_buffer[rows, slots] = active
+
+		g = groups["antenna"]
+		channels = np.bincount(self.antenna_channels[self.counts[g] > 0], minlength=self.channel_count) > 0
+		received = channels[self.antenna_channels]
+
+		nodes = np.concatenate((nodes, groups["delay"], groups["antenna"]))
+		value = np.concatenate((value, delayed, received))
+		changed = nodes[value != state[nodes]]
+
+		self.last_evaluated = len(nodes)
+		self.last_changed = len(changed)
+		self.total_evaluated += len(nodes)
+
+		state[changed] = ~state[changed]
+		self.pending = np.zeros(0, np.int64)
+		self.propagate(changed)
+		self.ticks += 1
+
+	def set_input(self, component, value, hold=True):
+		idx = self.index(component)
+		changed = self.state[idx] != bool(value)
+
+		super().set_input(idx, value, hold)
+		self.pending = np.union1d(self.pending, [idx])
+
+		if changed:
+			self.propagate(np.array([idx]))
+
+	def release(self, component):
+		idx = self.index(component)
+
+		super().release(idx)
+		self.pending = np.union1d(self.pending, [idx])
+
+
+# Splits the netlist into balanced parts with few wires between them, nodes are laid out in BFS order, cut into contiguous
+# chunks and then refined by moving boundary nodes towards the part most of their neighbors are in.
+def partition(arrays, parts, passes=4, imbalance=0.05):
+	size = len(arrays)
+	edges = arrays.get_edges()
+	edges = np.concatenate((edges, edges[:, ::-1]))
+	edges = edges[np.argsort(edges[:, 0], kind="stable")]
+
+	offsets = np.concatenate(([0], np.cumsum(np.bincount(edges[:, 0], minlength=size))))
+	neighbors = edges[:, 1].tolist()
+	offsets_list = offsets.tolist()
+
+	explored = np.zeros(size, bool)
+	order = []
+
+	for root in range(size):
+		if explored[root]:
+			continue
+
+		explored[root] = True
+		unexplored = collections.deque([root])
+
+		while len(unexplored):
+			node = unexplored.popleft()
+			order.append(node)
+
+			for subnode in neighbors[offsets_list[node]:offsets_list[node + 1]]:
+				if not explored[subnode]:
+					explored[subnode] = True
+					unexplored.append(subnode)
+
+	labels = np.empty(size, np.int64)
+	labels[np.array(order, np.int64)] = np.arange(size) * parts // max(size, 1)
+
+	capacity = int(np.ceil(size / parts * (1 + imbalance)))
+
+	for _ in range(passes):
+		histogram = np.bincount(edges[:, 0] * parts + labels[edges[:, 1]], minlength=size * parts).reshape(size, parts)
+		best = histogram.argmax(axis=1)
+		gain = histogram[np.arange(size), best] - histogram[np.arange(size), labels]
+
+		candidates = np.flatnonzero(gain > 0)
+		candidates = candidates[np.argsort(-gain[candidates], kind="stable")]
+
+		if len(candidates) <= 0:
+			break
+
+		sizes = np.bincount(labels, minlength=parts)
+
+		for node in candidates.tolist():
+			target = best[node]
+
+			if sizes[target] < capacity:
+				sizes[labels[node]] -= 1
+				sizes[target] += 1
+				labels[node] = target
+
+	# Antennas share their channel state so they are all kept in a single part
+	labels[arrays.types == CM.ComponentTypes.ANTENNA.value] = 0
+
+	return labels
+
+def _partition_worker(connection, barrier, memory_names, size, arrays, nodes, owned):
+	state_memory = shared_memory.SharedMemory(memory_names[0])
+	held_memory = shared_memory.SharedMemory(memory_names[1])
+
+	states = np.ndarray((2, size), bool, state_memory.buf)
+	held = np.ndarray(size, bool, held_memory.buf)
+
+	simulator = Simulator(arrays)
+	ghosts = ~owned
+	outputs = nodes[owned]
+
+	while (command := connection.recv()) is not None:
+		(start, ticks) = command
+
+		for tick in range(start, start + ticks):
+			# Only components of this part are evaluated, the states of the ones feeding it are read from the previous tick
+			simulator.state = states[tick % 2][nodes]
+			simulator.held = held[nodes] | ghosts
+			simulator.tick()
+
+			states[(tick + 1) % 2][outputs] = simulator.state[owned]
+			barrier.wait()
+
+		connection.send(True)
+
+	del states, held
+	state_memory.close()
+	held_memory.close()
+
+# Runs Simulator over partitions of the creation in separate processes, states live in shared memory and every
+# worker only reads the states of the components wired into its part.
+class PartitionedSimulator:
+	def __init__(self, creation, workers=4):
+		self.index_map = {}
+
+		if isinstance(creation, CM.Creation):
+			self.index_map = {id(component): idx for idx, component in enumerate(creation.components)}
+			creation = CM.CreationArrays().from_creation(creation)
+
+		size = len(creation)
+
+		self.arrays = creation
+		self.size = size
+		self.ticks = 0
+		self.labels = partition(creation, workers)
+
+		self.state_memory = shared_memory.SharedMemory(create=True, size=max(2 * size, 1))
+		self.held_memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+		self.states = np.ndarray((2, size), bool, self.state_memory.buf)
+		self.held = np.ndarray(size, bool, self.held_memory.buf)
+
+		self.states[0] = creation.states.astype(bool)
+		self.held[:] = creation.types == CM.ComponentTypes.BUTTON.value
+
+		barrier = multiprocessing.Barrier(workers)
+		memory_names = (self.state_memory.name, self.held_memory.name)
+		[sources, targets] = creation.get_edges().T
+
+		self.connections = []
+		self.processes = []
+
+		for part in range(workers):
+			owned = self.labels == part
+			nodes = np.union1d(np.flatnonzero(owned), sources[owned[targets]])
+
+			[connection, child_connection] = multiprocessing.Pipe()
+			process = multiprocessing.Process(
+				target=_partition_worker,
+				args=(child_connection, barrier, memory_names, size, creation.subset(nodes), nodes, owned[nodes]),
+				daemon=True
+			)
+			process.start()
+
+			self.connections.append(connection)
+			self.processes.append(process)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *_):
+		self.close()
+
+	def close(self):
+		for connection in self.connections:
+			connection.send(None)
+
+		for process in self.processes:
+			process.join()
+
+		del self.states, self.held
+		self.state_memory.close()
+		self.state_memory.unlink()
+		self.held_memory.close()
+		self.held_memory.unlink()
+
+	@property
+	def state(self):
+		return self.states[self.ticks % 2]
+
+	def step(self, ticks=1):
+		for connection in self.connections:
+			connection.send((self.ticks, ticks))
+
+		for connection in self.connections:
+			connection.recv()
+
+		self.ticks += ticks
+
+		return self.state
+
+	def index(self, component):
+		return self.index_map[id(component)] if isinstance(component, CM.Component) else int(component)
+
+	def set_input(self, component, value, hold=True):
+		idx = self.index(component)
+
+		self.state[idx] = bool(value)
+		self.held[idx] = hold
+
+	def set_inputs(self, components, values, hold=True):
+		for component, value in zip(components, values):
+			self.set_input(component, value, hold)
+
+	def release(self, component):
+		idx = self.index(component)
+		self.held[idx] = self.arrays.types[idx] == CM.ComponentTypes.BUTTON.value
+
+	def get_state(self, component):
+		return bool(self.state[self.index(component)])
+
+	def probe(self, components):
+		return self.state[[self.index(component) for component in components]]
@@ -0,0 +1,234 @@
+import heapq
+import math
+import numpy as np
+
+
+# Undirected (M, 2) edges between movable nodes as local indices, plus the edges to fixed nodes as (local index, fixed node)
+def _split_edges(edges, local):
+	edges = np.asarray(edges, np.int64).reshape(-1, 2)
+	edges = edges[edges[:, 0] != edges[:, 1]]
+	edges = np.concatenate((edges, edges[:, ::-1]))
+	edges = edges[local[edges[:, 0]] >= 0]
+
+	free = local[edges[:, 1]] >= 0
+
+	return local[edges[free]], np.stack((local[edges[~free, 0]], edges[~free, 1]), axis=1)
+
+# Quadratic wire length placement of the movable nodes in the X/Z plane, fixed nodes (such as inputs and outputs) act as anchors.
+# Every movable node is also pulled towards its current position with the given weight, this keeps the system solvable
+# when nothing is fixed and keeps unconnected nodes where they are.
+# Solves the Laplacian system with Jacobi preconditioned conjugate gradients, both axes at once.
+def global_placement(positions, edges, movable=None, anchor=1e-2, tolerance=1e-5, iterations=1000):
+	positions = np.array(positions, np.float64).reshape(-1, 3)
+	movable = np.arange(len(positions)) if movable is None else np.asarray(movable, np.int64)
+
+	local = np.full(len(positions), -1, np.int64)
+	local[movable] = np.arange(len(movable))
+
+	[inner, outer] = _split_edges(edges, local)
+	size = len(movable)
+	axes = [0, 2]
+
+	diagonal = np.bincount(inner[:, 0], minlength=size) + np.bincount(outer[:, 0], minlength=size) + anchor
+	start = positions[movable][:, axes]
+	rhs = anchor * start
+	rhs[:, 0] += np.bincount(outer[:, 0], weights=positions[outer[:, 1], axes[0]], minlength=size)
+	rhs[:, 1] += np.bincount(outer[:, 0], weights=positions[outer[:, 1], axes[1]], minlength=size)
+
+	def multiply(x):
+		result = diagonal[:, None] * x
+		result[:, 0] -= np.bincount(inner[:, 0], weights=x[inner[:, 1], 0], minlength=size)
+		result[:, 1] -= np.bincount(inner[:, 0], weights=x[inner[:, 1], 1], minlength=size)
+
+		return result
+
+	x = start.copy()
+	residual = rhs - multiply(x)
+	z = residual / diagonal[:, None]
+	direction = z.copy()
+	rz = (residual * z).sum(axis=0)
+	limit = tolerance * np.maximum(np.linalg.norm(rhs, axis=0), 1e-12)
+
+	for _ in range(iterations):
+		if np.all(np.linalg.norm(residual, axis=0) <= limit):
+			break
+
+		product = multiply(direction)
+		alpha = rz / np.maximum((direction * product).sum(axis=0), 1e-300)
+		x += alpha * direction
+		residual -= alpha * product
+
+		z = residual / diagonal[:, None]
+		next_rz = (residual * z).sum(axis=0)
+		direction = z + (next_rz / np.maximum(rz, 1e-300)) * direction
+		rz = next_rz
+
+	positions[movable[:, None], axes] = x
+
+	return positions
+
+# Spreads the movable nodes over a square block of unique integer cells in the X/Z plane while keeping their relative order,
+# nodes are sorted into columns by X and within every column by Z. The block is centered on the nodes and lies on their median Y.
+def spread(positions, movable=None):
+	positions = np.array(positions, np.float64).reshape(-1, 3)
+	movable = np.arange(len(positions)) if movable is None else np.asarray(movable, np.int64)
+
+	if len(movable) == 0:
+		return positions
+
+	columns = int(np.ceil(np.sqrt(len(movable))))
+	rows = int(np.ceil(len(movable) / columns))
+	points = positions[movable]
+
+	order = np.argsort(points[:, 0], kind="stable")
+	column = np.arange(len(order)) // rows
+	order = order[np.lexsort((points[order, 2], column))]
+
+	corner = np.round(points.mean(axis=0) - (columns / 2, 0, rows / 2))
+	cells = np.empty((len(order), 3))
+	cells[:, 0] = corner[0] + np.arange(len(order)) // rows
+	cells[:, 1] = np.round(np.median(points[:, 1]))
+	cells[:, 2] = corner[2] + np.arange(len(order)) % rows
+
+	positions[movable[order]] = cells
+
+	return positions
+
+c_legalizer_levels = 10 # Rows of a layer are grouped into aligned bands of up to 2^10 rows
+
+# Occupancy of integer cells with nearest free cell queries in the X/Z plane of a layer.
+# Every row (a Y and Z pair) keeps two pointer maps over its occupied X coordinates, pointing to the next candidate on
+# the right and on the left, they are compressed while searching so finding the free cell next to a run of occupied
+# ones takes amortized near constant time. Aligned bands of 2^k rows keep the same maps over the X coordinates occupied
+# in every one of their rows, which bounds the distance to a free cell for the whole band at once. Searches go best
+# first over the bands, so rows that cannot hold a closer cell are skipped in groups instead of one at a time.
+class Legalizer:
+	def __init__(self):
+		self.right = {}
+		self.left = {}
+		self.counts = {}
+
+	def occupied(self, cell):
+		x, y, z = cell
+		return x in self.right.get((y, 0, z), ())
+
+	def _fill(self, band, x):
+		self.right.setdefault(band, {})[x] = x + 1
+		self.left.setdefault(band, {})[x] = x - 1
+
+	def occupy(self, cell):
+		if self.occupied(cell):
+			return
+
+		x, y, z = cell
+		self._fill((y, 0, z), x)
+
+		for level in range(1, c_legalizer_levels + 1):
+			band = (y, level, z >> level)
+			counts = self.counts.setdefault(band, {})
+			counts[x] = counts.get(x, 0) + 1
+
+			if counts[x] == 1 << level:
+				self._fill(band, x)
+
+	def occupy_many(self, cells):
+		for cell in cells:
+			self.occupy(cell)
+
+	@staticmethod
+	def _find(pointers, x):
+		path = []
+
+		while x in pointers:
+			path.append(x)
+			x = pointers[x]
+
+		for visited in path:
+			pointers[visited] = x
+
+		return x
+
+	# Lower bound on the squared distance to the cells of a band (exact for single rows), with the closest X that is free in one of its rows
+	def _bound(self, px, pz, y, level, index):
+		lower = index << level
+		upper = lower + (1 << level) - 1
+		dz = max(lower - pz, pz - upper, 0)
+
+		band = (y, level, index)
+		x = round(px)
+		right = self.right.get(band)
+
+		if right is not None:
+			[candidate, x] = [self._find(right, x), self._find(self.left[band], x)]
+			x = candidate if abs(candidate - px) <= abs(x - px) else x
+
+		return ((x - px) ** 2 + dz * dz, level, index, x)
+
+	# Free cell in the layer of a float position, at most tolerance (relative) further away than the nearest one.
+	# Around the middle of a large cluster many rows hold a free cell at almost the same distance, the tolerance
+	# ends the search once no band left can be noticeably closer instead of going through every one of those rows.
+	def nearest(self, position, tolerance=0.1):
+		px, py, pz = map(float, position)
+		y = round(py)
+		cell = (round(px), y, round(pz))
+
+		if not self.occupied(cell):
+			return cell
+
+		[best_cost, _, best_z, best_x] = self._bound(px, pz, y, 0, round(pz))
+
+		# Only rows closer than the best cell of the center row can hold a better one, they are covered with as few bands as possible
+		lower = math.ceil(pz - math.sqrt(best_cost))
+		upper = math.floor(pz + math.sqrt(best_cost))
+		heap = []
+
+		while lower <= upper:
+			alignment = (lower & -lower).bit_length() - 1 if lower != 0 else c_legalizer_levels
+			level = min(alignment, (upper - lower + 1).bit_length() - 1, c_legalizer_levels)
+			heap.append(self._bound(px, pz, y, level, lower >> level))
+			lower += 1 << level
+
+		heapq.heapify(heap)
+
+		while heap:
+			entry = heapq.heappop(heap)
+			[bound, level, index, _] = entry
+
+			if best_cost <= bound * (1 + tolerance) ** 2:
+				break
+
+			# Follows the closer half of the band down to a row, so there is a real cell to compare the other bands with
+			while level > 0:
+				[entry, other] = sorted((self._bound(px, pz, y, level - 1, 2 * index), self._bound(px, pz, y, level - 1, 2 * index + 1)))
+				[_, level, index, _] = entry
+				heapq.heappush(heap, other)
+
+			if entry[0] < best_cost:
+				[best_cost, _, best_z, best_x] = entry
+
+		return (best_x, y, best_z)
+
+	def place(self, position, tolerance=0.1):
+		cell = self.nearest(position, tolerance)
+		self.occupy(cell)
+
+		return cell
+
+# Maps the movable nodes onto unique integer cells close to their positions, cells of the other nodes and the
+# given extra cells are kept free. Nodes are placed in order of X, each one onto the nearest free cell of its layer (Tetris like),
+# or one at most tolerance further away (see Legalizer.nearest).
+def legalize(positions, movable=None, occupied=(), tolerance=0.1):
+	positions = np.array(positions, np.float64).reshape(-1, 3)
+	movable = np.arange(len(positions)) if movable is None else np.asarray(movable, np.int64)
+
+	fixed = np.ones(len(positions), bool)
+	fixed[movable] = False
+
+	legalizer = Legalizer()
+	legalizer.occupy_many(map(tuple, np.round(positions[fixed]).astype(np.int64).tolist()))
+	legalizer.occupy_many(map(tuple, occupied))
+
+	order = movable[np.lexsort((positions[movable, 2], positions[movable, 0]))]
+	positions[order] = [legalizer.place(position, tolerance) for position in positions[order].tolist()]
+
+	return positions
@@ -1,13 +1,16 @@
-import matplotlib.pyplot as plt
 import argparse
+import concurrent.futures
 import random
 import numpy as np
+import enum
+import copy
+import time
+import json
+import os
 
-import vispy.scene as scene
-import vispy
-
-from mpl_toolkits.mplot3d import Axes3D
+from math import dist
 from CircuitMaker import Creation, ComponentTypes
+from Placement import global_placement, spread, legalize
 from tqdm import tqdm
 
 c_neighbors = [
@@ -66,6 +69,43 @@ c_colors = {
 	ComponentTypes.ANTENNA: [0, 0.5, 0.3]
 }
 
+class DistanceMetrics(enum.Enum):
+	EUCLIDEAN = 0
+	MANHATTAN = 1
+
+def manhattan_distance(a, b):
+	return abs(a[0] - b[0]) + abs(a[1] - b[1]) + abs(a[2] - b[2])
+
+c_distance_functions = {
+	DistanceMetrics.EUCLIDEAN: dist,
+	DistanceMetrics.MANHATTAN: manhattan_distance
+}
+
+# Total wire length of a placement given as (E, 2) edges into (N, 3) positions
+def total_wire_length(edges, positions, metric=DistanceMetrics.EUCLIDEAN):
+	edges = np.asarray(edges, np.int64).reshape(-1, 2)
+	positions = np.asarray(positions, np.float64).reshape(-1, 3)
+	delta = positions[edges[:, 0]] - positions[edges[:, 1]]
+
+	match metric:
+		case DistanceMetrics.EUCLIDEAN:
+			return float(np.sqrt(np.einsum("ij,ij->i", delta, delta)).sum())
+
+		case DistanceMetrics.MANHATTAN:
+			return float(np.abs(delta).sum())
+
+# (E, 2) edges between components following their outputs, connections to components outside of the list are left out
+def placement_edges(components):
+	mapping = {id(component): idx for idx, component in enumerate(components)}
+	edges = [
+		(idx, mapping[id(node)])
+		for idx, component in enumerate(components)
+		for node in component.outputs
+		if node is not component and id(node) in mapping
+	]
+
+	return np.array(edges, np.int64).reshape(-1, 2)
+
 def cast_position(position):
 	return tuple(map(int, position))
 
@@ -94,49 +134,291 @@ class _SpatialMap:
 			if tuple(coord) not in self.mapping:
 				yield coord
 
+	# Random free neighbor cell, or None when all of them are taken
 	def get_neighbor(self, position):
 		for neighbor in self.neighbors(position):
 			return neighbor
 		
-		return position
-
+		return None
+
+c_grid_cells = 1 << 24 # Dense grids may always grow up to this many cells (64 MB)
+c_grid_ratio = 64      # Past that, up to this many cells per item before switching to the sparse form
+
+def _pack_cell(x, y, z):
+	return ((x + (1 << 20)) << 42) | ((y + (1 << 20)) << 21) | (z + (1 << 20))
+
+# Occupancy grid over integer cells, each cell holds the index of its item in items or -1 when empty.
+# Cells are addressed by integer ids so lookups, swaps and neighbor queries are plain array accesses.
+#
+# Dense form: ids are flat indices into a grid over the bounding box. An empty border of one cell is kept around every
+# occupied cell so neighbor cells never fall outside of the grid, indexing outside of it grows the grid and invalidates
+# previously returned cell ids.
+# Sparse form: used once the bounding box would be much larger than the amount of items (e.g. one stray block far away
+# from the rest). Only indexed cells get an id, found through a dict of packed coordinates, and every cell keeps the ids
+# of its neighbors in links. Cell 0 is a sentinel that stays empty and stands for neighbors without an id.
 class SpatialLookup:
-	def __init__(self):
-		self.lookup = {}
+	def __init__(self, offsets=c_neighbors):
+		self.offsets = np.array(offsets, np.int64)
+		self.items = []
+		self.origin = np.zeros(3, np.int64)
+		self.corner = (0, 0, 0)
+		self.cells = np.full(0, -1, np.int32)
+		self.shape = (0, 0, 0)
+		self.neighbor_offsets = np.zeros(len(self.offsets), np.int64)
+		self.links = None
+
+	def clear(self):
+		self.__init__(self.offsets)
+
+	def _resize(self, lower, upper):
+		old_origin, old_shape = self.origin, self.shape
+		old_cells = self.cells.reshape(old_shape)
+
+		self.origin = lower - 1
+		self.corner = tuple(self.origin.tolist())
+		self.shape = tuple((upper - lower + 3).tolist())
+		self.cells = np.full(self.shape, -1, np.int32)
+
+		start = old_origin - self.origin
+		self.cells[
+			start[0]:start[0] + old_shape[0],
+			start[1]:start[1] + old_shape[1],
+			start[2]:start[2] + old_shape[2]
+		] = old_cells
+
+		self.cells = self.cells.reshape(-1)
+		self.neighbor_offsets = self.offsets @ np.array([self.shape[1] * self.shape[2], self.shape[2], 1], np.int64)
+		self.neighbor_list = self.neighbor_offsets.tolist()
+
+	def _make_sparse(self):
+		occupied = np.flatnonzero(self.cells >= 0)
+		points = self.coordinates(occupied) if len(occupied) > 0 else np.zeros((0, 3), np.int64)
+		values = self.cells[occupied]
+
+		offsets = self.offsets.tolist()
+		self.opposite = [offsets.index([-dx, -dy, -dz]) if [-dx, -dy, -dz] in offsets else -1 for [dx, dy, dz] in offsets]
+		self.table = {}
+		self.points = np.zeros((1, 3), np.int64)
+		self.links = np.zeros((1, len(offsets)), np.int64)
+		self.cells = np.full(1, -1, np.int32)
+		self.size = 1
+
+		for point, value in zip(points.tolist(), values.tolist()):
+			cell = self._create(*point)
+			self.cells[cell] = value
+
+	# Id of a cell in the sparse form, allocating it and linking it to its neighbors when it has none yet
+	def _create(self, x, y, z):
+		key = _pack_cell(x, y, z)
+		cell = self.table.get(key)
+
+		if cell is not None:
+			return cell
+
+		if self.size >= len(self.cells):
+			capacity = 2 * len(self.cells)
+			self.cells = np.concatenate((self.cells, np.full(capacity - len(self.cells), -1, np.int32)))
+			self.points = np.concatenate((self.points, np.zeros((capacity - len(self.points), 3), np.int64)))
+			self.links = np.concatenate((self.links, np.zeros((capacity - len(self.links), len(self.offsets)), np.int64)))
+
+		cell = self.size
+		self.size += 1
+		self.table[key] = cell
+		self.points[cell] = (x, y, z)
+
+		for idx, [dx, dy, dz] in enumerate(self.offsets.tolist()):
+			neighbor = self.table.get(_pack_cell(x + dx, y + dy, z + dz), 0)
+			self.links[cell, idx] = neighbor
+
+			if neighbor != 0 and self.opposite[idx] >= 0:
+				self.links[neighbor, self.opposite[idx]] = cell
+
+		return cell
+
+	# Makes room for the cells between lower and upper (inclusive), grows by at least half of the grid to keep it amortized.
+	# Switches to the sparse form when the grid would get too large for the amount of items.
+	def reserve(self, lower, upper, count=1):
+		if self.links is not None:
+			return
+
+		lower = np.asarray(lower, np.int64)
+		upper = np.asarray(upper, np.int64)
+
+		if len(self.cells) == 0:
+			new_lower, new_upper = lower, upper
+		else:
+			inner_lower = self.origin + 1
+			inner_upper = self.origin + self.shape - 2
+
+			if np.all(lower >= inner_lower) and np.all(upper <= inner_upper):
+				return
+
+			margin = (inner_upper - inner_lower + 1) // 2
+			new_lower = np.where(lower < inner_lower, np.minimum(lower, inner_lower - margin), inner_lower)
+			new_upper = np.where(upper > inner_upper, np.maximum(upper, inner_upper + margin), inner_upper)
+
+		volume = int(np.prod(new_upper - new_lower + 3))
+
+		if volume > max(c_grid_cells, c_grid_ratio * (len(self.items) + count)):
+			return self._make_sparse()
+
+		self._resize(new_lower, new_upper)
+
+	def cell(self, position):
+		x, y, z = cast_position(position)
+
+		if self.links is not None:
+			return self.table[_pack_cell(x, y, z)]
+
+		ox, oy, oz = self.corner
+		sx, sy, sz = self.shape
+		x, y, z = x - ox, y - oy, z - oz
+
+		if not (0 <= x < sx and 0 <= y < sy and 0 <= z < sz):
+			raise KeyError(position)
+
+		return (x * sy + y) * sz + z
+
+	def cells_of(self, positions):
+		positions = np.asarray(positions, np.int64).reshape(-1, 3)
+
+		if self.links is not None:
+			return np.array([self.table[_pack_cell(*position)] for position in positions.tolist()], np.int64)
+
+		positions = positions - self.origin
+		return (positions[:, 0] * self.shape[1] + positions[:, 1]) * self.shape[2] + positions[:, 2]
+
+	def coordinate(self, cell):
+		if self.links is not None:
+			return self.points[cell].copy()
+
+		x, rest = divmod(int(cell), self.shape[1] * self.shape[2])
+		y, z = divmod(rest, self.shape[2])
+
+		return self.origin + (x, y, z)
+
+	def coordinates(self, cells):
+		if self.links is not None:
+			return self.points[cells]
+
+		return self.origin + np.stack(np.unravel_index(cells, self.shape), axis=-1)
 
 	def index(self, position, item):
-		self.lookup[cast_position(position)] = item
+		self.reserve(cast_position(position), cast_position(position))
+
+		cell = self._create(*cast_position(position)) if self.links is not None else self.cell(position)
+		self.cells[cell] = len(self.items)
+		self.items.append(item)
+
+	def index_many(self, positions, items):
+		positions = np.asarray(positions, np.int64).reshape(-1, 3)
+
+		if len(positions) == 0:
+			return
+
+		self.reserve(positions.min(axis=0), positions.max(axis=0), len(positions))
+
+		if self.links is not None:
+			cells = [self._create(*position) for position in positions.tolist()]
+		else:
+			cells = self.cells_of(positions)
+
+		self.cells[cells] = np.arange(len(self.items), len(self.items) + len(positions), dtype=np.int32)
+		self.items.extend(items)
 
 	def delete(self, position):
-		del self.lookup[cast_position(position)]
+		cell = self.cell(position)
+
+		if self.cells[cell] < 0:
+			raise KeyError(position)
+
+		self.cells[cell] = -1
 
 	def value(self, position):
-		return self.lookup[cast_position(position)]
-	
+		return self.item(self.cell(position))
+
+	def item(self, cell):
+		idx = self.cells[cell]
+
+		if idx < 0:
+			raise KeyError(self.coordinate(cell))
+
+		return self.items[idx]
+
 	def swap(self, pos_a, pos_b):
-		val_a = self.value(pos_a)
-		val_b = self.value(pos_b)
+		self.swap_cells(self.cell(pos_a), self.cell(pos_b))
 
-		self.index(pos_b, val_a)
-		self.index(pos_a, val_b)
+	def swap_cells(self, cell_a, cell_b):
+		cells = self.cells
+		cells[cell_a], cells[cell_b] = cells[cell_b], cells[cell_a]
 
 	def occupied_neighbors(self, position):
-		position = cast_position(position)
-
-		for offset in random.sample(c_neighbors, len(c_neighbors)):
-			coord = np.array(position) + offset
+		for cell in self.occupied_neighbor_cells(self.cell(position)):
+			yield self.coordinate(cell)
 
-			if cast_position(coord) in self.lookup:
-				yield coord
-	
 	def empty_neighbors(self, position):
-		position = cast_position(position)
+		cells = self.cells
 
-		for offset in random.sample(c_neighbors, len(c_neighbors)):
-			coord = np.array(position) + offset
+		if self.links is not None:
+			position = np.array(cast_position(position))
 
-			if cast_position(coord) not in self.lookup:
-				yield coord
+			try:
+				links = self.links[self.cell(position)]
+			except KeyError:
+				links = np.zeros(len(self.offsets), np.int64)
+
+			for idx in random.sample(range(len(self.offsets)), len(self.offsets)):
+				if cells[links[idx]] < 0:
+					yield position + self.offsets[idx]
+
+			return
+
+		cell = self.cell(position)
+
+		for offset in random.sample(self.neighbor_list, len(self.neighbor_list)):
+			if cells[cell + offset] < 0:
+				yield self.coordinate(cell + offset)
+
+	def occupied_neighbor_cells(self, cell):
+		cells = self.cells
+
+		if self.links is not None:
+			neighbors = [neighbor for neighbor in self.links[cell].tolist() if cells[neighbor] >= 0]
+		else:
+			neighbors = [cell + offset for offset in self.neighbor_list if cells[cell + offset] >= 0]
+
+		random.shuffle(neighbors)
+
+		return neighbors
+
+	# Random occupied neighbor of a cell, or -1 when it has none
+	def occupied_neighbor(self, cell):
+		cells = self.cells
+
+		if self.links is not None:
+			neighbors = [neighbor for neighbor in self.links[cell].tolist() if cells[neighbor] >= 0]
+		else:
+			neighbors = [cell + offset for offset in self.neighbor_list if cells[cell + offset] >= 0]
+
+		return random.choice(neighbors) if neighbors else -1
+
+	# (B, K) neighbor cells and their occupancy for a batch of B occupied cells
+	def neighbors(self, cells):
+		if self.links is not None:
+			neighbors = self.links[np.asarray(cells, np.int64)]
+		else:
+			neighbors = np.asarray(cells, np.int64)[:, None] + self.neighbor_offsets
+
+		return neighbors, self.cells[neighbors] >= 0
+
+	# Random occupied neighbor for each cell of a batch, -1 for cells without one
+	def random_occupied_neighbors(self, cells, rng=None):
+		rng = np.random.default_rng() if rng is None else rng
+		neighbors, occupied = self.neighbors(cells)
+		keys = np.where(occupied, rng.random(occupied.shape), -1.0)
+		choice = keys.argmax(axis=1)
+
+		return np.where(occupied.any(axis=1), neighbors[np.arange(len(neighbors)), choice], -1)
 
 class RollingAverage:
 	def __init__(self, sample_count=1024):
@@ -160,33 +442,349 @@ class RollingAverage:
 	def calculate(self):
 		return sum(self.samples) / max(self.samples)
 
+# Running total wire length of a placement, every connection counted once.
+# Positions are kept as tuples and neighbors as index lists so swaps are evaluated with scalar math
+# over the edges touching the swapped pair only.
 class LossTable:
-	def __init__(self):
-		self.table = {}
+	def __init__(self, metric=DistanceMetrics.EUCLIDEAN):
+		self.metric = metric
+		self.distance = c_distance_functions[metric]
+		self.items = []
+		self.mapping = {}
+		self.positions = []
+		self.neighbors = []
+		self.edges = np.zeros((0, 2), np.int64)
 		self.total = 0
 
 	def add_items(self, items):
 		for item in items:
-			self.add_item(item)
+			self.mapping[id(item)] = len(self.items)
+			self.items.append(item)
+			self.positions.append(tuple(map(float, item.position)))
+
+		self.edges = placement_edges(self.items)
+		self.neighbors = [[] for _ in self.items]
+
+		for a, b in self.edges.tolist():
+			self.neighbors[a].append(b)
+			self.neighbors[b].append(a)
+
+		self.update_total()
 
 	def add_item(self, item):
-		self.table[item] = 0
-		self.local_heuristic(item)
-	
-	def local_heuristic(self, item, proposed=None):
-		center = proposed if proposed is not None else item.position
-		total = 0
-		last = self.table[item]
+		self.add_items([item])
+
+	def index(self, item):
+		return self.mapping[id(item)]
+
+	def local_heuristic(self, idx, proposed=None):
+		positions = self.positions
+		center = proposed if proposed is not None else positions[idx]
+
+		distance = self.distance
+
+		return sum(distance(center, positions[node]) for node in self.neighbors[idx])
+
+	# Wire length of the edges touching a or b before and after swapping their positions,
+	# edges between a and b keep their length and are left out
+	def swap_cost(self, a, b):
+		positions = self.positions
+		distance = self.distance
+		position_a = positions[a]
+		position_b = positions[b]
+		before = after = 0.0
+
+		for node in self.neighbors[a]:
+			if node != b:
+				position = positions[node]
+				before += distance(position_a, position)
+				after += distance(position_b, position)
+
+		for node in self.neighbors[b]:
+			if node != a:
+				position = positions[node]
+				before += distance(position_b, position)
+				after += distance(position_a, position)
+
+		return before, after
+
+	def swap(self, a, b, difference):
+		positions = self.positions
+		positions[a], positions[b] = positions[b], positions[a]
+		self.total += difference
+
+	# Full recomputation, also used to get rid of the floating point drift of the running total
+	def update_total(self):
+		self.total = total_wire_length(self.edges, self.positions, self.metric)
+		return self.total
+
+
+# Headless annealer over index arrays. Every step proposes a batch of swaps between occupied neighbor cells,
+# keeps the ones that touch neither each other nor each other's wires so their costs are independent,
+# and evaluates and applies them with NumPy.
+class Annealer:
+	def __init__(self, positions, edges, movable=None, metric=DistanceMetrics.EUCLIDEAN, offsets=c_neighbors, seed=None):
+		self.positions = np.array(positions, np.float64).reshape(-1, 3)
+		self.edges = np.asarray(edges, np.int64).reshape(-1, 2)
+		self.metric = metric
+		self.rng = np.random.default_rng(seed)
+
+		size = len(self.positions)
+		self.movable = np.arange(size) if movable is None else np.asarray(movable, np.int64)
+
+		# Undirected CSR adjacency, without self connections
+		edges = self.edges[self.edges[:, 0] != self.edges[:, 1]]
+		edges = np.concatenate((edges, edges[:, ::-1]))
+		edges = edges[np.argsort(edges[:, 0], kind="stable")]
+
+		self.offsets = np.concatenate(([0], np.cumsum(np.bincount(edges[:, 0], minlength=size))))
+		self.neighbors = edges[:, 1]
+
+		# Swaps need every movable node on its own integer cell, which no fixed node may share either
+		cells = self.positions[self.movable]
+		fixed = np.ones(size, bool)
+		fixed[self.movable] = False
+		fixed_cells = np.unique(np.round(self.positions[fixed]), axis=0)
+
+		if np.any(cells != np.round(cells)) or len(np.unique(np.concatenate((cells, fixed_cells)), axis=0)) < len(cells) + len(fixed_cells):
+			self.positions = legalize(self.positions, self.movable)
+
+		self.lookup = SpatialLookup(offsets)
+		self.lookup.index_many(self.positions[self.movable], self.movable.tolist())
+		self.slots = self.movable.copy()
+
+		self.node_cells = np.full(size, -1, np.int64)
+		self.node_cells[self.movable] = self.lookup.cells_of(self.positions[self.movable])
+
+		self.total = total_wire_length(self.edges, self.positions, metric)
+		self.temperature = 0.0
+		self.progress = 0
+		self.moves = 0
+		self.accepted = 0
+		self.elapsed = 0.0
+
+	@staticmethod
+	def from_creation(creation, **kwargs):
+		components = creation.components
+		fixed = {id(component) for component in [*creation.get_inputs(), *creation.get_outputs()]}
+		movable = [idx for idx, component in enumerate(components) if id(component) not in fixed]
+
+		return Annealer([component.position for component in components], placement_edges(components), movable, **kwargs)
+
+	# Replaces the placement of the movable nodes with a spread out and legalized quadratic placement, a much better start than a random one
+	def warm_start(self, anchor=1e-2):
+		rng = self.rng
+		positions = legalize(spread(global_placement(self.positions, self.edges, self.movable, anchor), self.movable), self.movable)
+
+		self.__init__(positions, self.edges, self.movable, self.metric, self.lookup.offsets)
+		self.rng = rng
+
+		return self
+
+	def apply(self, creation):
+		for component, position in zip(creation.components, self.positions):
+			component.position = position.copy()
+
+	def _distance(self, a, b):
+		delta = a - b
+
+		match self.metric:
+			case DistanceMetrics.EUCLIDEAN:
+				return np.sqrt(np.einsum("ij,ij->i", delta, delta))
+
+			case DistanceMetrics.MANHATTAN:
+				return np.abs(delta).sum(axis=1)
+
+	# Independent swaps (a, b) out of batch_size random proposals
+	def propose(self, batch_size):
+		lookup = self.lookup
+
+		a = self.rng.choice(self.movable, batch_size)
+		neighbor_cells = lookup.random_occupied_neighbors(self.node_cells[a], self.rng)
+		a = a[neighbor_cells >= 0]
+		b = self.slots[lookup.cells[neighbor_cells[neighbor_cells >= 0]]]
+
+		# Every node in at most one swap
+		nodes = np.concatenate((a, b))
+		first = np.zeros(len(nodes), bool)
+		first[np.unique(nodes, return_index=True)[1]] = True
+		keep = first[:len(a)] & first[len(a):]
+		a, b = a[keep], b[keep]
+
+		# No wire between the nodes of two different swaps
+		nodes = np.concatenate((a, b))
+		owner = np.full(len(self.positions), -1, np.int64)
+		owner[nodes] = np.tile(np.arange(len(a)), 2)
+
+		entry_nodes, entry_neighbors = self._entries(nodes)
+		entry_owner = owner[nodes][entry_nodes]
+		neighbor_owner = owner[entry_neighbors]
+		conflicts = (neighbor_owner >= 0) & (neighbor_owner != entry_owner)
+
+		# Of two conflicting swaps the later proposal is dropped, the proposals come in random order already
+		keep = np.ones(len(a), bool)
+		keep[np.maximum(entry_owner[conflicts], neighbor_owner[conflicts])] = False
+
+		return a[keep], b[keep]
+
+	# CSR entries of a list of nodes as (position in nodes, neighbor)
+	def _entries(self, nodes):
+		starts = self.offsets[nodes]
+		degrees = self.offsets[nodes + 1] - starts
+		entry_nodes = np.repeat(np.arange(len(nodes)), degrees)
+		entries = np.arange(len(entry_nodes)) - np.repeat(np.cumsum(degrees) - degrees, degrees) + starts[entry_nodes]
+
+		return entry_nodes, self.neighbors[entries]
+
+	# Cost change of every independent swap, edges between a and b keep their length and are left out
+	def swap_costs(self, a, b):
+		positions = self.positions
+		nodes = np.concatenate((a, b))
+		partners = np.concatenate((b, a))
+
+		entry_nodes, entry_neighbors = self._entries(nodes)
+		entry_partners = partners[entry_nodes]
+		outside = entry_neighbors != entry_partners
+		entry_nodes, entry_neighbors, entry_partners = entry_nodes[outside], entry_neighbors[outside], entry_partners[outside]
+
+		neighbor_positions = positions[entry_neighbors]
+		change = self._distance(positions[entry_partners], neighbor_positions) - self._distance(positions[nodes[entry_nodes]], neighbor_positions)
+
+		return np.bincount(entry_nodes % len(a), weights=change, minlength=len(a)) if len(a) > 0 else np.zeros(0)
+
+	def step(self, temperature, batch_size=1024):
+		if len(self.movable) == 0:
+			return
+
+		a, b = self.propose(batch_size)
+		difference = self.swap_costs(a, b)
+
+		if temperature > 0:
+			accept = (difference < 0) | (self.rng.random(len(a)) < np.exp(-np.maximum(difference, 0) / temperature))
+		else:
+			accept = difference < 0
+
+		a, b = a[accept], b[accept]
+		positions = self.positions
+		positions[a], positions[b] = positions[b], positions[a].copy()
+
+		cells = self.lookup.cells
+		cell_a, cell_b = self.node_cells[a], self.node_cells[b]
+		cells[cell_a], cells[cell_b] = cells[cell_b], cells[cell_a].copy()
+		self.node_cells[a], self.node_cells[b] = cell_b, cell_a
+
+		self.total += float(difference[accept].sum())
+		self.moves += len(accept)
+		self.accepted += len(a)
+
+	# Linear schedule from initial_temperature down to final_temperature, over at least the given amount of proposals.
+	# Continues from self.progress (steps already done), stops early once budget seconds have passed,
+	# callback is called with the annealer after every step.
+	def anneal(self, iterations, initial_temperature=100, final_temperature=0, batch_size=1024, correction=64, budget=None, callback=None):
+		start = time.perf_counter()
+		steps = max(1, -(-iterations // batch_size))
 
-		for node in [*item.outputs, *item.inputs]:
-			total += np.linalg.norm(center - node.position)
+		# Nothing to swap, the schedule is done right away
+		if len(self.movable) == 0:
+			self.progress = max(self.progress, steps)
 
-		self.table[item] = total
+		while self.progress < steps:
+			if budget is not None and time.perf_counter() - start >= budget:
+				break
 
-		return self.total - (last - total)
+			fraction = self.progress / steps
+			self.temperature = initial_temperature + (final_temperature - initial_temperature) * fraction
+			self.step(self.temperature, batch_size)
+			self.progress += 1
+
+			if self.progress % correction == 0:
+				self.update_total()
+
+			if callback is not None:
+				callback(self)
+
+		self.update_total()
+		self.elapsed += time.perf_counter() - start
+
+		return self
+
+	def run(self, temperature, iterations, batch_size=1024):
+		self.progress = 0
+		return self.anneal(iterations, temperature, temperature, batch_size)
+
+	def save_checkpoint(self, filepath):
+		filepath = str(filepath)
+		temporary = filepath + ".tmp"
+
+		with open(temporary, "wb") as file:
+			np.savez(
+				file,
+				positions=self.positions,
+				counters=np.array([self.progress, self.moves, self.accepted], np.int64),
+				elapsed=self.elapsed,
+				temperature=self.temperature,
+				rng=json.dumps(self.rng.bit_generator.state)
+			)
+
+		os.replace(temporary, filepath)
+
+	# Restores a checkpoint written by save_checkpoint for the same circuit
+	def load_checkpoint(self, filepath):
+		with np.load(filepath) as checkpoint:
+			positions = checkpoint["positions"]
+
+			if positions.shape != self.positions.shape:
+				raise ValueError(f"Checkpoint \"{filepath}\" holds {len(positions)} positions, expected {len(self.positions)}")
+
+			self.__init__(positions, self.edges, self.movable, self.metric, self.lookup.offsets)
+
+			[self.progress, self.moves, self.accepted] = checkpoint["counters"].tolist()
+			self.elapsed = float(checkpoint["elapsed"])
+			self.temperature = float(checkpoint["temperature"])
+			self.rng.bit_generator.state = json.loads(str(checkpoint["rng"]))
 
 	def update_total(self):
-		self.total = sum(self.table.values())
+		self.total = total_wire_length(self.edges, self.positions, self.metric)
+		return self.total
+
+	def moves_per_second(self):
+		return self.moves / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _temper_worker(annealer, temperature, iterations, batch_size):
+	return annealer.run(temperature, iterations, batch_size)
+
+# Parallel tempering, one replica per temperature annealed in a process pool, neighboring temperatures exchange
+# placements between rounds following the Metropolis criterion. Returns the replicas sorted by temperature and the
+# best wire length of every round.
+def parallel_tempering(annealer, temperatures, rounds, iterations, batch_size=1024, workers=None, seed=None):
+	rng = np.random.default_rng(seed)
+	replicas = [copy.deepcopy(annealer) for _ in temperatures]
+	history = []
+
+	for replica in replicas:
+		replica.rng = np.random.default_rng(rng.integers(1 << 63))
+
+	with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+		for _ in range(rounds):
+			replicas = list(executor.map(
+				_temper_worker,
+				replicas,
+				temperatures,
+				[iterations] * len(replicas),
+				[batch_size] * len(replicas)
+			))
+
+			for idx in range(len(replicas) - 1):
+				cold, hot = temperatures[idx], temperatures[idx + 1]
+				criterion = (replicas[idx].total - replicas[idx + 1].total) * (1 / max(cold, 1e-12) - 1 / max(hot, 1e-12))
+
+				if criterion >= 0 or rng.random() < np.exp(criterion):
+					replicas[idx], replicas[idx + 1] = replicas[idx + 1], replicas[idx]
+
+			history.append(min(replica.total for replica in replicas))
+
+	return replicas, history
 
 
 def wire_length(component, position=None):
@@ -205,6 +803,9 @@ def wire_length(component, position=None):
 	return total
 
 def graph(components):
+	import vispy.scene as scene
+	import vispy
+
 	canvas = scene.SceneCanvas(keys="interactive", show=True)
 	view = canvas.central_widget.add_view()
 
@@ -225,6 +826,18 @@ def graph(components):
 	scene.visuals.XYZAxis(parent=view.scene)
 	vispy.app.run()
 
+# Writes a 3D scatter of the placement to an image, without needing a display
+def render_snapshot(filepath, positions, colors):
+	import matplotlib
+	matplotlib.use("Agg")
+	import matplotlib.pyplot as plt
+
+	figure = plt.figure(figsize=(8, 8))
+	axes = figure.add_subplot(projection="3d")
+	axes.scatter(positions[:, 0], positions[:, 2], positions[:, 1], c=colors, s=2, depthshade=False)
+	figure.savefig(filepath, dpi=100)
+	plt.close(figure)
+
 def parse_arguments():
 	parser = argparse.ArgumentParser(description="Utility to convert CM2 logic circuits into a graph")
 
@@ -234,24 +847,163 @@ def parse_arguments():
 		required=True, type=str
 	)
 
+	parser.add_argument(
+		"--headless",
+		help="Run the batched annealer at full speed without a window",
+		action="store_true"
+	)
+
+	parser.add_argument(
+		"--output", "-o",
+		help="Save file to write the placed circuit to, printed when omitted",
+		type=str
+	)
+
+	parser.add_argument(
+		"--iterations",
+		help="Amount of proposed swaps of the whole schedule",
+		default=100_000_000, type=int
+	)
+
+	parser.add_argument(
+		"--time",
+		help="Time budget in seconds, the run stops early once it is used up and can be resumed from its checkpoint",
+		type=float
+	)
+
+	parser.add_argument(
+		"--temperature",
+		help="Initial temperature, decreasing linearly to zero",
+		default=100, type=float
+	)
+
+	parser.add_argument(
+		"--batch-size",
+		help="Swaps proposed per batch",
+		default=1024, type=int
+	)
+
+	parser.add_argument(
+		"--checkpoint",
+		help="File the positions and progress are regularly saved to",
+		type=str
+	)
+
+	parser.add_argument(
+		"--checkpoint-interval",
+		help="Seconds between checkpoints",
+		default=60, type=float
+	)
+
+	parser.add_argument(
+		"--resume",
+		help="Continue from the checkpoint if it exists",
+		action="store_true"
+	)
+
+	parser.add_argument(
+		"--snapshot",
+		help="Image the placement is rendered to during the run",
+		type=str
+	)
+
+	parser.add_argument(
+		"--snapshot-interval",
+		help="Seconds between snapshots",
+		default=30, type=float
+	)
+
+	parser.add_argument(
+		"--global-placement",
+		help="Start from a quadratic global placement instead of the positions of the save (ignored when resuming)",
+		action="store_true"
+	)
+
+	parser.add_argument(
+		"--seed",
+		help="Seed of the random generator",
+		type=int
+	)
+
 	return parser.parse_args()
 
+def headless(arguments):
+	creation = Creation()
+	creation.deserialize_file(arguments.input)
+	creation.bridge_connections()
+
+	annealer = Annealer.from_creation(creation, seed=arguments.seed)
+	colors = np.array([c_colors[component.type] for component in creation.components]).reshape(-1, 3)
+
+	if arguments.resume and arguments.checkpoint and os.path.exists(arguments.checkpoint):
+		annealer.load_checkpoint(arguments.checkpoint)
+	elif arguments.global_placement:
+		annealer.warm_start()
+
+	steps = max(1, -(-arguments.iterations // arguments.batch_size))
+	last_checkpoint = last_snapshot = time.perf_counter()
+
+	bar = tqdm(total=steps, initial=annealer.progress)
+
+	def callback(annealer):
+		nonlocal last_checkpoint, last_snapshot
+
+		if annealer.progress % 64 != 0:
+			return
+
+		bar.n = annealer.progress
+		bar.set_postfix({
+			"temp": annealer.temperature,
+			"energy": int(annealer.total),
+			"accepted": annealer.accepted
+		})
+
+		now = time.perf_counter()
+
+		if arguments.checkpoint and now - last_checkpoint >= arguments.checkpoint_interval:
+			annealer.save_checkpoint(arguments.checkpoint)
+			last_checkpoint = now
+
+		if arguments.snapshot and now - last_snapshot >= arguments.snapshot_interval:
+			render_snapshot(arguments.snapshot, annealer.positions, colors)
+			last_snapshot = now
+
+	annealer.anneal(arguments.iterations, arguments.temperature, 0, arguments.batch_size, budget=arguments.time, callback=callback)
+	bar.n = annealer.progress
+	bar.close()
+
+	if arguments.checkpoint:
+		annealer.save_checkpoint(arguments.checkpoint)
+
+	if arguments.snapshot:
+		render_snapshot(arguments.snapshot, annealer.positions, colors)
+
+	print(f"Wire length: {annealer.total:.2f}, {annealer.moves_per_second():.0f} moves/s, {annealer.progress}/{steps} steps")
+
+	annealer.apply(creation)
+
+	if arguments.output:
+		creation.serialize_file(arguments.output)
+	else:
+		print(creation.serialize())
+
 def _main():
 	initial_temperature = 100
 	iterations = 5_000_000
 
-	spatial_map = SpatialMap()
+	spatial_map = _SpatialMap()
 	creation = Creation()
 	creation.deserialize()
 	creation.bridge_connections()
 
 	components = creation.components
-	energy = 0
+	positions = legalize(np.random.randint(0, 101, (len(components), 3)))
 
-	for component in components:
-		component.position = np.array([random.randint(0, 100), random.randint(0, 100), random.randint(0, 100)])
+	for component, position in zip(components, positions):
+		component.position = position
 		spatial_map.mark(component.position)
-		energy += wire_length(component)
+
+	energy = total_wire_length(placement_edges(components), positions)
 	
 	print(energy)
 
@@ -269,6 +1021,9 @@ def _main():
 		proposed_position = spatial_map.get_neighbor(candidate.position)
 		current_position = candidate.position
 
+		if proposed_position is None:
+			continue
+
 		proposed_loss = wire_length(candidate, proposed_position)
 		current_loss = wire_length(candidate, current_position)
 		
@@ -279,8 +1034,8 @@ def _main():
 		if difference < 0:# or random.random() < criterion:
 			candidate.position = proposed_position
 			
-			#spatial_map.unmark(current_position)
-			#spatial_map.mark(proposed_position)
+			spatial_map.unmark(current_position)
+			spatial_map.mark(proposed_position)
 
 			energy += difference
 		
@@ -309,6 +1064,12 @@ def main():
 
 	arguments = parse_arguments()
 
+	if arguments.headless:
+		return headless(arguments)
+
+	import vispy.scene as scene
+	import vispy
+
 	spatial_lookup = SpatialLookup()
 	loss_average = RollingAverage()
 	loss_table = LossTable()
@@ -316,28 +1077,22 @@ def main():
 	creation.deserialize_file(arguments.input)
 	creation.bridge_connections()
 
-	blacklist = [*creation.get_inputs(), *creation.get_outputs()]
+	blacklist = {id(component) for component in [*creation.get_inputs(), *creation.get_outputs()]}
 	components = creation.components
-	energy = 0
-
-	for component in components:
-		if component in blacklist:
-			continue
-		
-		spatial_lookup.index(component.position, component)
-		energy += wire_length(component)
+	movable = [idx for idx, component in enumerate(components) if id(component) not in blacklist]
 
-	loss_average.resize(len(components))
 	loss_table.add_items(components)
+	spatial_lookup.index_many([components[idx].position for idx in movable], movable)
+	loss_average.resize(len(components))
 	
-	print(energy)
+	print(loss_table.total)
 
 	bar = tqdm()
 	bar.total = iterations
 	i = 0
 
 	def iterate():
-		nonlocal i, energy
+		nonlocal i
 		
 		time = i / iterations
 
@@ -346,34 +1101,24 @@ def main():
 		temperature = initial_temperature * (1.0 - time)
 
 		candidate = None
-		positions = tuple()
+		candidate_cell = neighbor_cell = -1
 
-		while not candidate or len(positions) == 0 or candidate in blacklist:
-			candidate = random.choice(components)
-			if candidate:
-				positions = tuple(spatial_lookup.occupied_neighbors(candidate.position))
+		while neighbor_cell < 0:
+			candidate = random.choice(movable)
+			candidate_cell = spatial_lookup.cell(loss_table.positions[candidate])
+			neighbor_cell = spatial_lookup.occupied_neighbor(candidate_cell)
 		
-		proposed_position = random.choice(positions)
-		current_position = candidate.position
-
-		neighbor = spatial_lookup.value(proposed_position)
-
-		current_loss = wire_length(candidate, current_position) + wire_length(neighbor, proposed_position)
-
-		candidate.position = proposed_position
-		neighbor.position = current_position
-		proposed_loss = wire_length(candidate, proposed_position) + wire_length(neighbor, current_position)
+		neighbor = spatial_lookup.item(neighbor_cell)
+		current_loss, proposed_loss = loss_table.swap_cost(candidate, neighbor)
 		
 		difference = proposed_loss - current_loss
-		criterion = np.pow(-difference / temperature, 2)
+		criterion = (difference / temperature) ** 2
 
 		if difference < 0 or random.random() < criterion:
-			spatial_lookup.swap(current_position, proposed_position)
+			spatial_lookup.swap_cells(candidate_cell, neighbor_cell)
+			loss_table.swap(candidate, neighbor, difference)
 
-			energy += difference
-		else:
-			candidate.position = current_position
-			neighbor.position = proposed_position
+			components[candidate].position, components[neighbor].position = components[neighbor].position, components[candidate].position
 
 		loss_average.sample(current_loss)
 
@@ -382,9 +1127,13 @@ def main():
 			bar.set_postfix({
 				"temp": temperature,
 				"loss": int(current_loss),
+				"energy": int(loss_table.total),
 				"average": loss_average.calculate()
 			})
 
+		if i % 1_048_576 == 0:
+			loss_table.update_total()
+
 		i += 1
 
 	canvas = scene.SceneCanvas(keys="interactive", show=True)
@@ -0,0 +1,56 @@
+import argparse
+import time
+
+from common import parse_sizes, random_creation
+from CircuitMakerSimulator import BatchSimulator, Simulator
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Benchmark of vector-ticks per second of the bit parallel BatchSimulator against Simulator")
+
+	parser.add_argument(
+		"--size",
+		help="Component count of the generated circuit",
+		default=100_000, type=int
+	)
+
+	parser.add_argument(
+		"--words",
+		help="Comma separated 64 bit words per component (64 vectors each)",
+		default="1,4,16", type=str
+	)
+
+	parser.add_argument(
+		"--ticks",
+		help="Ticks per measurement",
+		default=50, type=int
+	)
+
+	return parser.parse_args()
+
+def ticks_per_second(simulator, ticks):
+	simulator.tick()
+
+	start = time.perf_counter()
+
+	for _ in range(ticks):
+		simulator.tick()
+
+	return ticks / (time.perf_counter() - start)
+
+def main():
+	arguments = parse_arguments()
+	creation = random_creation(arguments.size)
+
+	print(f"{'simulator':<20} {'vectors':>8} {'ticks/s':>10} {'vector-ticks/s':>16}")
+
+	rate = ticks_per_second(Simulator(creation), arguments.ticks)
+	print(f"{'Simulator':<20} {1:>8} {rate:>10.1f} {rate:>16.3g}")
+
+	for words in parse_sizes(arguments.words):
+		simulator = BatchSimulator(creation, words)
+		rate = ticks_per_second(simulator, arguments.ticks)
+		print(f"{'BatchSimulator':<20} {simulator.vectors:>8} {rate:>10.1f} {rate * simulator.vectors:>16.3g}")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,75 @@
+import pathlib
+import sys
+import time
+import numpy as np
+
+# Benchmarks are run as scripts from anywhere, the modules live at the top of the repository
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from CircuitMaker import Creation, Component, ComponentTypes, StateTypes
+
+
+c_gate_types = [
+	ComponentTypes.GATE_NOR,
+	ComponentTypes.GATE_AND,
+	ComponentTypes.GATE_OR,
+	ComponentTypes.GATE_XOR,
+	ComponentTypes.GATE_NAND,
+	ComponentTypes.GATE_XNOR,
+	ComponentTypes.FLIPFLOP,
+	ComponentTypes.NODE
+]
+
+# (E, 2) zero based edges of a synthetic netlist, every component drives fanout others, mostly close by in index
+# (like synthesized logic) and a few anywhere. Self connections are left out.
+def random_edges(size, fanout=2, locality=64, seed=0):
+	rng = np.random.default_rng(seed)
+	sources = np.repeat(np.arange(size, dtype=np.int64), fanout)
+	near = sources + rng.integers(1, locality + 1, len(sources))
+	far = rng.integers(0, size, len(sources))
+	targets = np.where(rng.random(len(sources)) < 0.9, near, far) % size
+	edges = np.stack((sources, targets), axis=1)
+
+	return edges[edges[:, 0] != edges[:, 1]]
+
+# Creation of size gates on a square grid wired by random_edges, connections are appended directly since make_connection
+# checks for duplicates with a linear scan
+def random_creation(size, fanout=2, locality=64, seed=0):
+	rng = np.random.default_rng(seed)
+	width = max(int(np.ceil(np.sqrt(size))), 1)
+	types = rng.integers(0, len(c_gate_types), size).tolist()
+	states = rng.random(size) < 0.5
+
+	components = [
+		Component(c_gate_types[block_type], StateTypes(int(state)), (idx % width, 0, idx // width))
+		for idx, (block_type, state) in enumerate(zip(types, states.tolist()))
+	]
+
+	for (source, target) in random_edges(size, fanout, locality, seed).tolist():
+		components[source].outputs.append(components[target])
+		components[target].inputs.append(components[source])
+
+	return Creation(components)
+
+# (N, 3) positions of size nodes shuffled over a square of integer cells, the way the annealing of main starts
+def grid_placement(size, seed=0):
+	width = max(int(np.ceil(np.sqrt(size))), 1)
+	cells = np.arange(size)
+	positions = np.stack((cells % width, np.zeros(size), cells // width), axis=1).astype(np.float64)
+
+	return positions[np.random.default_rng(seed).permutation(size)]
+
+# Best wall time of repeat calls in seconds, together with the result of the last one
+def measure(function, repeat=3):
+	best = float("inf")
+	result = None
+
+	for _ in range(repeat):
+		start = time.perf_counter()
+		result = function()
+		best = min(best, time.perf_counter() - start)
+
+	return best, result
+
+def parse_sizes(text):
+	return [int(float(size)) for size in text.split(',')]
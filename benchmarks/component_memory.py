@@ -0,0 +1,72 @@
+import argparse
+import gc
+import tracemalloc
+import numpy as np
+
+from common import c_gate_types
+from CircuitMaker import Component, ComponentTypes, StateTypes, default_augments
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Benchmark of the memory used per Component, measured with tracemalloc")
+
+	parser.add_argument(
+		"--size",
+		help="Components created per measurement",
+		default=200_000, type=int
+	)
+
+	return parser.parse_args()
+
+# Component as it was before slots and lazy positions, every instance had a __dict__ and its own position array
+class DictComponent:
+	def __init__(self, type=ComponentTypes.GATE_NOR, state=StateTypes.OFF, position=(0, 0, 0), inputs=None, outputs=None, augments=None):
+		self.augments = augments or default_augments[ComponentTypes(type)]
+		self.position = np.array(position)
+		self.outputs = outputs or []
+		self.inputs = inputs or []
+		self.state = state
+		self.type = ComponentTypes(type)
+
+# Traced bytes per item kept alive by build
+def bytes_per_item(build, size):
+	gc.collect()
+	tracemalloc.start()
+
+	items = build(size)
+	current = tracemalloc.get_traced_memory()[0]
+
+	tracemalloc.stop()
+	del items
+
+	return current / size
+
+def build_components(component_type, size, width):
+	return [component_type(c_gate_types[idx % len(c_gate_types)], StateTypes.OFF, (idx % width, 0, idx // width)) for idx in range(size)]
+
+def main():
+	arguments = parse_arguments()
+	width = max(int(np.sqrt(arguments.size)), 1)
+
+	def serialized(size):
+		components = build_components(Component, size, width)
+
+		for component in components:
+			component.fragment()
+
+		return components
+
+	cases = [
+		("dict component (before)", lambda size: build_components(DictComponent, size, width)),
+		("slots component", lambda size: build_components(Component, size, width)),
+		("slots component, position read", lambda size: [component for component in build_components(Component, size, width) if component.position is not None]),
+		("slots component, fragment cached", serialized)
+	]
+
+	print(f"{'':<34} {'bytes/component':>16}")
+
+	for (name, build) in cases:
+		print(f"{name:<34} {bytes_per_item(build, arguments.size):>16.0f}")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,53 @@
+import argparse
+import itertools
+import pathlib
+import tempfile
+import time
+
+from common import random_creation
+from CircuitMaker import CompressionTypes, CreationArrays
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Benchmark of save size and write/read speed for every compression and wire encoding")
+
+	parser.add_argument(
+		"--size",
+		help="Component count of the generated creation",
+		default=200_000, type=int
+	)
+
+	return parser.parse_args()
+
+def main():
+	arguments = parse_arguments()
+	creation = random_creation(arguments.size)
+
+	print(f"{'compression':<12} {'delta':<6} {'MB':>8} {'ratio':>7} {'write s':>9} {'read s':>8}")
+
+	with tempfile.TemporaryDirectory() as directory:
+		plain = None
+
+		for (compression, delta_wires) in itertools.product(CompressionTypes, [False, True]):
+			filepath = pathlib.Path(directory) / f"{compression.name}-{delta_wires}.save"
+
+			# Cached fragments would make every write after the first one cheaper
+			creation.invalidate()
+
+			start = time.perf_counter()
+			creation.serialize_file(filepath, compression, delta_wires)
+			write = time.perf_counter() - start
+
+			start = time.perf_counter()
+			arrays = CreationArrays().deserialize_file(filepath, cache=False)
+			read = time.perf_counter() - start
+
+			assert len(arrays) == len(creation.components)
+
+			size = filepath.stat().st_size
+			plain = plain or size
+
+			print(f"{compression.name:<12} {str(delta_wires):<6} {size / 1e6:>8.2f} {plain / size:>6.1f}x {write:>9.2f} {read:>8.2f}")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,104 @@
+import argparse
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import random_creation
+from CircuitMaker import Creation, CreationArrays, deserialize_block, deserialize_wire
+
+
+c_modes = ["split", "stream", "arrays"]
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Benchmark of the peak memory used while loading a save, every mode runs in its own process")
+
+	parser.add_argument(
+		"--size",
+		help="Component count of the generated save",
+		default=200_000, type=int
+	)
+
+	parser.add_argument(
+		"--input", "-i",
+		help="Save to load instead of a generated one",
+		default=None, type=str
+	)
+
+	parser.add_argument(
+		"--mode",
+		help=argparse.SUPPRESS,
+		default=None, choices=["write", *c_modes]
+	)
+
+	return parser.parse_args()
+
+# Peak resident set size of this process in MB, Linux reports kilobytes and macOS bytes
+def peak_rss():
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+# How saves were loaded before deserialize_stream, the whole text and both split lists are held at once
+def load_split(filepath):
+	creation = Creation()
+	string = pathlib.Path(filepath).read_text()
+	[blocks, wires, _customs, *_] = [part.split(';') for part in string.split('?')]
+
+	for block in blocks:
+		creation.add_component(deserialize_block(block))
+
+	for wire in wires:
+		deserialize_wire(wire, creation.components)
+
+	return creation
+
+def load(mode, filepath):
+	match mode:
+		case "split":
+			return len(load_split(filepath).components)
+
+		case "stream":
+			creation = Creation()
+			creation.deserialize_file(filepath, cache=False)
+			return len(creation.components)
+
+		case "arrays":
+			return len(CreationArrays().deserialize_file(filepath, cache=False))
+
+def run_child(mode, filepath, size):
+	if mode == "write":
+		random_creation(size).serialize_file(filepath)
+		return
+
+	baseline = peak_rss()
+	start = time.perf_counter()
+	count = load(mode, filepath)
+	elapsed = time.perf_counter() - start
+
+	print(f"{mode:>8} {count:>12} {elapsed:>10.2f} {peak_rss() - baseline:>10.1f}")
+
+def main():
+	arguments = parse_arguments()
+
+	if arguments.mode is not None:
+		run_child(arguments.mode, arguments.input, arguments.size)
+		return
+
+	with tempfile.TemporaryDirectory() as directory:
+		filepath = arguments.input
+
+		# Written by a child as well, the peak RSS of a parent carries over into the processes it starts
+		if filepath is None:
+			filepath = str(pathlib.Path(directory) / "save.txt")
+			subprocess.run([sys.executable, __file__, "--mode", "write", "--input", filepath, "--size", str(arguments.size)], check=True)
+
+		print(f"Save: {pathlib.Path(filepath).stat().st_size / 1e6:.1f} MB")
+		print(f"{'mode':>8} {'components':>12} {'seconds':>10} {'peak MB':>10}")
+
+		for mode in c_modes:
+			subprocess.run([sys.executable, __file__, "--mode", mode, "--input", filepath], check=True)
+
+if __name__ == "__main__":
+	main()
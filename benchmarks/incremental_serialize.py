@@ -0,0 +1,77 @@
+import argparse
+import time
+import numpy as np
+
+from common import random_creation
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Benchmark of repeated Creation.serialize calls when only a fraction of the components moved")
+
+	parser.add_argument(
+		"--size",
+		help="Component count of the generated creation",
+		default=200_000, type=int
+	)
+
+	parser.add_argument(
+		"--fractions",
+		help="Comma separated fractions of components moved between calls",
+		default="0,0.01,0.1,1", type=str
+	)
+
+	parser.add_argument(
+		"--rounds",
+		help="Serialize calls per fraction, the average is reported",
+		default=5, type=int
+	)
+
+	parser.add_argument(
+		"--verify",
+		help="Compare every incremental result with a serialization from scratch",
+		action="store_true"
+	)
+
+	return parser.parse_args()
+
+def main():
+	arguments = parse_arguments()
+	creation = random_creation(arguments.size)
+	components = creation.components
+	rng = np.random.default_rng(0)
+
+	start = time.perf_counter()
+	creation.serialize()
+	cold = time.perf_counter() - start
+
+	print(f"{'changed':>8} {'seconds':>10} {'speedup':>8}")
+	print(f"{'cold':>8} {cold:>10.3f} {1:>7.2f}x")
+
+	for fraction in map(float, arguments.fractions.split(',')):
+		elapsed = 0.0
+
+		for _ in range(arguments.rounds):
+			moved = rng.choice(len(components), int(fraction * len(components)), replace=False).tolist()
+
+			# Half of the moves replace the position, the other half modify the position array in place
+			for count, idx in enumerate(moved):
+				component = components[idx]
+
+				if count % 2 == 0:
+					component.position = component.position + (0, 1, 0)
+				else:
+					component.position[1] -= 1
+
+			start = time.perf_counter()
+			string = creation.serialize()
+			elapsed += time.perf_counter() - start
+
+			if arguments.verify:
+				creation.invalidate()
+				assert string == creation.serialize()
+
+		elapsed /= arguments.rounds
+		print(f"{fraction:>8.0%} {elapsed:>10.3f} {cold / elapsed:>7.2f}x")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,52 @@
+import argparse
+import os
+import time
+
+from common import parse_sizes, random_creation
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Benchmark of Creation.serialize_parallel throughput over worker counts")
+
+	parser.add_argument(
+		"--size",
+		help="Component count of the generated creation",
+		default=500_000, type=int
+	)
+
+	parser.add_argument(
+		"--workers",
+		help="Comma separated worker counts",
+		default="1,2,4,8", type=str
+	)
+
+	parser.add_argument(
+		"--chunk-size",
+		help="Blocks and wires formatted per task",
+		default=1 << 16, type=int
+	)
+
+	return parser.parse_args()
+
+def main():
+	arguments = parse_arguments()
+	creation = random_creation(arguments.size)
+
+	start = time.perf_counter()
+	expected = creation.serialize()
+	serial = time.perf_counter() - start
+
+	print(f"{os.cpu_count()} CPUs, {len(expected) / 1e6:.1f} MB")
+	print(f"{'workers':>8} {'seconds':>10} {'MB/s':>8} {'speedup':>8}")
+	print(f"{'serial':>8} {serial:>10.3f} {len(expected) / serial / 1e6:>8.1f} {1:>7.2f}x")
+
+	for workers in parse_sizes(arguments.workers):
+		start = time.perf_counter()
+		string = creation.serialize_parallel(workers, arguments.chunk_size)
+		elapsed = time.perf_counter() - start
+
+		assert string == expected, "Parallel output differs from the serial one"
+		print(f"{workers:>8} {elapsed:>10.3f} {len(string) / elapsed / 1e6:>8.1f} {serial / elapsed:>7.2f}x")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,38 @@
+import argparse
+
+from common import measure, parse_sizes, random_creation
+from CircuitMaker import deserialize_block, parse_blocks
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Benchmark of the bulk parse_blocks against parsing every block with deserialize_block")
+
+	parser.add_argument(
+		"--sizes",
+		help="Comma separated block counts",
+		default="1e4,1e5,1e6", type=str
+	)
+
+	parser.add_argument(
+		"--repeat",
+		help="Runs per size, the best one is reported",
+		default=3, type=int
+	)
+
+	return parser.parse_args()
+
+def main():
+	arguments = parse_arguments()
+
+	print(f"{'blocks':>10} {'deserialize_block':>18} {'parse_blocks':>14} {'speedup':>8}")
+
+	for size in parse_sizes(arguments.sizes):
+		blocks = random_creation(size, fanout=0).serialize().split('?')[0].split(';')
+
+		[per_block, _] = measure(lambda: [deserialize_block(block) for block in blocks], arguments.repeat)
+		[bulk, _] = measure(lambda: parse_blocks(blocks), arguments.repeat)
+
+		print(f"{size:>10} {per_block:>17.3f}s {bulk:>13.3f}s {per_block / bulk:>7.1f}x")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,58 @@
+import argparse
+import os
+import time
+
+from common import parse_sizes, random_creation
+from CircuitMaker import CreationArrays
+from CircuitMakerSimulator import PartitionedSimulator, Simulator
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Benchmark of PartitionedSimulator ticks per second over worker counts")
+
+	parser.add_argument(
+		"--size",
+		help="Component count of the generated circuit",
+		default=500_000, type=int
+	)
+
+	parser.add_argument(
+		"--workers",
+		help="Comma separated worker counts",
+		default="1,2,4,8", type=str
+	)
+
+	parser.add_argument(
+		"--ticks",
+		help="Ticks per measurement",
+		default=100, type=int
+	)
+
+	return parser.parse_args()
+
+def main():
+	arguments = parse_arguments()
+	arrays = CreationArrays().from_creation(random_creation(arguments.size))
+
+	print(f"{os.cpu_count()} CPUs, {len(arrays)} components")
+	print(f"{'workers':>8} {'ticks/s':>10} {'speedup':>8}")
+
+	simulator = Simulator(arrays)
+	start = time.perf_counter()
+	simulator.step(arguments.ticks)
+	serial = arguments.ticks / (time.perf_counter() - start)
+
+	print(f"{'serial':>8} {serial:>10.1f} {1:>7.2f}x")
+
+	for workers in parse_sizes(arguments.workers):
+		with PartitionedSimulator(arrays, workers) as simulator:
+			simulator.step()
+
+			start = time.perf_counter()
+			simulator.step(arguments.ticks)
+			rate = arguments.ticks / (time.perf_counter() - start)
+
+		print(f"{workers:>8} {rate:>10.1f} {rate / serial:>7.2f}x")
+
+if __name__ == "__main__":
+	main()
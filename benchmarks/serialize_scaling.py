@@ -0,0 +1,40 @@
+import argparse
+
+from common import measure, parse_sizes, random_creation
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Benchmark of Creation.serialize over growing creations, time per component should stay flat")
+
+	parser.add_argument(
+		"--sizes",
+		help="Comma separated component counts",
+		default="1e3,1e4,1e5,1e6", type=str
+	)
+
+	parser.add_argument(
+		"--repeat",
+		help="Runs per size, the best one is reported",
+		default=3, type=int
+	)
+
+	return parser.parse_args()
+
+def main():
+	arguments = parse_arguments()
+
+	print(f"{'components':>12} {'seconds':>10} {'us/component':>14} {'MB':>8}")
+
+	for size in parse_sizes(arguments.sizes):
+		creation = random_creation(size)
+
+		# Cached fragments would turn every run after the first into a cache hit
+		def serialize():
+			creation.invalidate()
+			return creation.serialize()
+
+		[elapsed, string] = measure(serialize, arguments.repeat)
+		print(f"{size:>12} {elapsed:>10.3f} {elapsed / size * 1e6:>14.2f} {len(string) / 1e6:>8.1f}")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,107 @@
+import argparse
+import random
+import time
+import numpy as np
+
+from common import grid_placement, random_edges
+from annealing import Annealer, LossTable
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Micro-benchmark of annealing moves per second on the SpatialLookup grid")
+
+	parser.add_argument(
+		"--size",
+		help="Node count of the generated placement",
+		default=100_000, type=int
+	)
+
+	parser.add_argument(
+		"--seconds",
+		help="Time spent per measurement",
+		default=5.0, type=float
+	)
+
+	parser.add_argument(
+		"--batch-size",
+		help="Proposals per Annealer.step",
+		default=1024, type=int
+	)
+
+	return parser.parse_args()
+
+class Node:
+	def __init__(self, position):
+		self.position = np.array(position, np.float64)
+		self.inputs = []
+		self.outputs = []
+
+# grid_placement with the first node far away if stray, which forces the sparse form of the lookup
+def stray_placement(size, stray):
+	positions = grid_placement(size)
+
+	if stray:
+		positions[0] = (1 << 20, 0, 1 << 20)
+
+	return positions
+
+# One proposal at a time through a LossTable, the way the annealing loop of main works
+def single_moves(positions, edges, seconds):
+	nodes = [Node(position) for position in positions]
+
+	for (a, b) in edges.tolist():
+		nodes[a].outputs.append(nodes[b])
+		nodes[b].inputs.append(nodes[a])
+
+	table = LossTable()
+	table.add_items(nodes)
+
+	annealer = Annealer(positions, edges)
+	lookup = annealer.lookup
+	moves = 0
+	start = time.perf_counter()
+
+	while time.perf_counter() - start < seconds:
+		for _ in range(1024):
+			a = random.randrange(len(nodes))
+			cell = lookup.cell(table.positions[a])
+			neighbor_cell = lookup.occupied_neighbor(cell)
+
+			if neighbor_cell < 0:
+				continue
+
+			b = lookup.item(neighbor_cell)
+			before, after = table.swap_cost(a, b)
+
+			if after < before:
+				lookup.swap_cells(cell, neighbor_cell)
+				table.swap(a, b, after - before)
+
+		moves += 1024
+
+	return moves / (time.perf_counter() - start)
+
+def batched_moves(positions, edges, seconds, batch_size):
+	annealer = Annealer(positions, edges, seed=0)
+	start = time.perf_counter()
+
+	while time.perf_counter() - start < seconds:
+		annealer.step(1.0, batch_size)
+
+	return annealer.moves / (time.perf_counter() - start), annealer.lookup.links is not None
+
+def main():
+	arguments = parse_arguments()
+	edges = random_edges(arguments.size)
+
+	print(f"{'mode':<22} {'lookup':<7} {'moves/s':>12}")
+
+	positions = stray_placement(arguments.size, False)
+	print(f"{'LossTable':<22} {'dense':<7} {single_moves(positions, edges, arguments.seconds):>12.0f}")
+
+	for stray in [False, True]:
+		[rate, sparse] = batched_moves(stray_placement(arguments.size, stray), edges, arguments.seconds, arguments.batch_size)
+		print(f"{'Annealer.step':<22} {sparse and 'sparse' or 'dense':<7} {rate:>12.0f}")
+
+if __name__ == "__main__":
+	main()
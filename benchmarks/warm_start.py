@@ -0,0 +1,69 @@
+import argparse
+import time
+
+from common import grid_placement, random_edges
+from annealing import Annealer
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Benchmark of annealing from a random placement against a quadratic warm start")
+
+	parser.add_argument(
+		"--size",
+		help="Node count of the generated circuit",
+		default=50_000, type=int
+	)
+
+	parser.add_argument(
+		"--iterations",
+		help="Proposals per annealing run",
+		default=20_000_000, type=int
+	)
+
+	parser.add_argument(
+		"--temperature",
+		help="Initial temperature of the linear schedule",
+		default=2.0, type=float
+	)
+
+	return parser.parse_args()
+
+# Wall time (including setup) and wire length after every step
+def run(annealer, setup, iterations, temperature):
+	trace = []
+	start = time.perf_counter() - setup
+
+	annealer.anneal(iterations, temperature, 0, callback=lambda annealer: trace.append((time.perf_counter() - start, annealer.total)))
+
+	return trace
+
+def time_to_reach(trace, target):
+	return next((elapsed for (elapsed, total) in trace if total <= target), float("nan"))
+
+def main():
+	arguments = parse_arguments()
+	edges = random_edges(arguments.size)
+	positions = grid_placement(arguments.size)
+
+	cold = Annealer(positions, edges, seed=0)
+	cold_start = cold.total
+	cold_trace = run(cold, 0.0, arguments.iterations, arguments.temperature)
+
+	start = time.perf_counter()
+	warm = Annealer(positions, edges, seed=0).warm_start()
+	setup = time.perf_counter() - start
+	warm_start = warm.total
+	warm_trace = run(warm, setup, arguments.iterations, arguments.temperature)
+
+	# Time until each run first got as good as the cold run did in the end
+	target = cold_trace[-1][1]
+
+	print(f"{'start':<6} {'initial':>12} {'final':>12} {'seconds':>9} {'to target':>10}")
+
+	for (name, initial, trace) in [("cold", cold_start, cold_trace), ("warm", warm_start, warm_trace)]:
+		print(f"{name:<6} {initial:>12.0f} {trace[-1][1]:>12.0f} {trace[-1][0]:>9.2f} {time_to_reach(trace, target):>10.2f}")
+
+	print(f"Warm start setup: {setup:.2f}s")
+
+if __name__ == "__main__":
+	main()
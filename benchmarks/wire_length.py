@@ -0,0 +1,53 @@
+import argparse
+import time
+import numpy as np
+
+from common import measure, random_edges
+from annealing import DistanceMetrics, total_wire_length
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Benchmark of the vectorized total_wire_length against summing np.linalg.norm per edge")
+
+	parser.add_argument(
+		"--edges",
+		help="Edge count of the generated graph",
+		default=500_000, type=int
+	)
+
+	parser.add_argument(
+		"--repeat",
+		help="Runs of the vectorized version, the best one is reported",
+		default=5, type=int
+	)
+
+	return parser.parse_args()
+
+# How the energy was computed before, one norm per edge
+def per_edge_wire_length(edges, positions):
+	return sum(np.linalg.norm(positions[a] - positions[b]) for (a, b) in edges.tolist())
+
+def main():
+	arguments = parse_arguments()
+	size = max(arguments.edges // 2, 1)
+	edges = random_edges(size, 2)
+	positions = np.random.default_rng(0).integers(0, int(np.sqrt(size)) + 1, (size, 3)).astype(np.float64)
+
+	start = time.perf_counter()
+	expected = per_edge_wire_length(edges, positions)
+	per_edge = time.perf_counter() - start
+
+	print(f"{len(edges)} edges")
+	print(f"{'version':<24} {'seconds':>10} {'speedup':>8}")
+	print(f"{'np.linalg.norm per edge':<24} {per_edge:>10.4f} {1:>7.1f}x")
+
+	for metric in DistanceMetrics:
+		[elapsed, total] = measure(lambda: total_wire_length(edges, positions, metric), arguments.repeat)
+
+		if metric == DistanceMetrics.EUCLIDEAN:
+			assert np.isclose(total, expected), "Vectorized total differs from the per edge sum"
+
+		print(f"{metric.name.lower():<24} {elapsed:>10.4f} {per_edge / elapsed:>7.1f}x")
+
+if __name__ == "__main__":
+	main()
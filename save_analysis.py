@@ -1,9 +1,10 @@
 import argparse
 import networkx
 import pathlib
+import numpy as np
 
 
-from CircuitMaker import Component, ComponentTypes, Creation
+from CircuitMaker import Component, ComponentTypes, CreationArrays, is_binary_save
 from enum import Enum
 
 
@@ -12,48 +13,41 @@ def parse_arguments():
 
 	parser.add_argument(
 		"--input", "-i",
-		help="The save file to use",
+		help="The save file to use (text or binary)",
 		required=True, type=str
 	)
 
 	return parser.parse_args()
 
-def genlen(generator):
-	return len(list(generator))
+def load_arrays(filepath):
+	# Binary saves are memory-mapped, augments are not needed for statistics
+	if is_binary_save(filepath):
+		return CreationArrays().load_binary(filepath, load_augments=False)
+
+	return CreationArrays().deserialize_file(filepath)
 
 def main():
 	arguments = parse_arguments()
 
 	print("Deserializing...")
-	creation = Creation()
-	creation.deserialize_file(arguments.input)
-
-	print("Bridging connections...")
-	# The output of bridge_connections is basically useless as it depends on the behavior of the deserializer.
-	creation.bridge_connections()
-
-	components = creation.components
-	component_count = len(components)
+	arrays = load_arrays(arguments.input)
+	component_count = len(arrays)
 
 	print("Acquiring interface data...")
-	unconnected_count = genlen(creation.get_unconnected())
-	output_count      = genlen(creation.get_outputs())
-	input_count       = genlen(creation.get_inputs())
+	output_degree = np.diff(arrays.offsets)
+	input_degree = np.bincount(arrays.targets, minlength=component_count)
 
-	print("Enumerating connections...")
-	output_wire_count = 0
-	input_wire_count = 0
-
-	for component in components:
-		output_wire_count += len(component.outputs)
-		input_wire_count += len(component.inputs)
+	unconnected_count = int(np.count_nonzero((input_degree == 0) & (output_degree == 0)))
+	output_count      = int(np.count_nonzero((input_degree > 0) & (output_degree == 0)))
+	input_count       = int(np.count_nonzero((input_degree == 0) & (output_degree > 0)))
 
-	# @todo For unknown reasons this assert fails sometimes.
-	assert input_wire_count == output_wire_count, f"Something caused bridge_connections to fail. {input_wire_count} != {output_wire_count}"
+	print("Enumerating connections...")
+	wire_count = len(arrays.targets)
+	type_counts = np.bincount(arrays.types, minlength=len(ComponentTypes))
 
 	print(f"\nComponents: {component_count}")
 	for component_type in ComponentTypes:
-		type_count = genlen(creation.components_by_type(component_type))
+		type_count = int(type_counts[component_type.value])
 
 		if type_count == 0:
 			continue
@@ -66,7 +60,7 @@ def main():
 	print(f"   Inputs: {input_count} ({(input_count / component_count) * 100.0:.2f}%)")
 	
 	print("\nConnections:")
-	print(f"   Wires: {(input_wire_count + output_wire_count) // 2}")
+	print(f"   Wires: {wire_count}")
 
 
 if __name__ == "__main__":
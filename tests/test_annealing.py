@@ -0,0 +1,87 @@
+import random
+
+import numpy as np
+import pytest
+
+pytest.importorskip("tqdm")
+
+from annealing import Annealer, DistanceMetrics, LossTable, SpatialLookup, total_wire_length
+
+
+class _Node:
+	def __init__(self, position):
+		self.position = np.array(position, np.float64)
+		self.inputs = []
+		self.outputs = []
+
+def _grid_netlist(size, width, seed):
+	rng = np.random.default_rng(seed)
+	positions = np.stack([np.arange(size) % width, np.zeros(size), np.arange(size) // width], axis=1).astype(np.float64)
+	sources = np.repeat(np.arange(size), 3)
+	targets = (sources + rng.choice([1, 2, width, width + 1, 7 * width], len(sources))) % size
+
+	return positions[rng.permutation(size)], np.stack([sources, targets], axis=1)
+
+@pytest.mark.parametrize("metric", list(DistanceMetrics))
+def test_loss_table_running_total(metric):
+	positions, edges = _grid_netlist(2000, 40, 0)
+	nodes = [_Node(position) for position in positions]
+
+	for a, b in edges.tolist():
+		nodes[a].outputs.append(nodes[b])
+		nodes[b].inputs.append(nodes[a])
+
+	table = LossTable(metric)
+	table.add_items(nodes)
+	lookup = SpatialLookup()
+	lookup.index_many(positions, list(range(len(nodes))))
+
+	assert table.total == pytest.approx(total_wire_length(edges, positions, metric))
+
+	rng = random.Random(1)
+
+	for _ in range(20_000):
+		a = rng.randrange(len(nodes))
+		cell = lookup.cell(table.positions[a])
+		neighbor_cell = lookup.occupied_neighbor(cell)
+
+		if neighbor_cell < 0:
+			continue
+
+		b = lookup.item(neighbor_cell)
+		before, after = table.swap_cost(a, b)
+
+		if after < before or rng.random() < 0.3:
+			lookup.swap_cells(cell, neighbor_cell)
+			table.swap(a, b, after - before)
+
+	running = table.total
+	assert running == pytest.approx(table.update_total(), rel=1e-9, abs=1e-6)
+	assert running == pytest.approx(total_wire_length(edges, table.positions, metric), rel=1e-9, abs=1e-6)
+
+@pytest.mark.parametrize("metric", list(DistanceMetrics))
+def test_annealer_running_total(metric):
+	positions, edges = _grid_netlist(5000, 70, 2)
+	annealer = Annealer(positions, edges, metric=metric, seed=3)
+
+	for _ in range(200):
+		annealer.step(2.0, 512)
+
+	running = annealer.total
+	assert annealer.accepted > 0
+	assert running == pytest.approx(annealer.update_total(), rel=1e-9, abs=1e-6)
+
+	# Placement is still a permutation of the cells and the lookup agrees with it
+	assert sorted(map(tuple, annealer.positions.tolist())) == sorted(map(tuple, positions.tolist()))
+
+	for node in range(len(positions)):
+		cell = annealer.node_cells[node]
+		assert annealer.slots[annealer.lookup.cells[cell]] == node
+		assert (annealer.lookup.coordinate(cell) == annealer.positions[node]).all()
+
+def test_annealer_without_movable_nodes():
+	annealer = Annealer([[0, 0, 0], [1, 0, 0]], [[0, 1]], movable=[])
+	annealer.anneal(10_000, 1, 0)
+
+	assert annealer.moves == 0
+	assert annealer.total == 1
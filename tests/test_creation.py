@@ -0,0 +1,212 @@
+import collections
+import random
+
+import pytest
+
+import CircuitMaker
+from CircuitMaker import AntennaTypes, Creation, CreationArrays, ComponentTypes, ParseCache, StateTypes, parse_blocks
+
+
+# Reference implementations of the original list based versions, used to check that the change counts did not change
+def _bridge_connections_reference(components):
+	changes = 0
+
+	for component in components:
+		for i in component.inputs:
+			if component in i.outputs:
+				continue
+
+			i.outputs.append(component)
+			changes += 1
+
+		for o in component.outputs:
+			if component in o.inputs:
+				continue
+
+			o.inputs.append(component)
+			changes += 1
+
+	return changes
+
+def _random_creation(size, wires, seed):
+	rng = random.Random(seed)
+	creation = Creation()
+	components = [creation.new_component(ComponentTypes.GATE_AND) for _ in range(size)]
+
+	for _ in range(wires):
+		a, b = rng.choice(components), rng.choice(components)
+		a.outputs.append(b)
+
+		if rng.random() < 0.5:
+			b.inputs.append(a)
+
+	return creation
+
+def test_bridge_connections_matches_reference():
+	creation = _random_creation(500, 2000, 1)
+	reference = _random_creation(500, 2000, 1)
+
+	assert creation.bridge_connections() == _bridge_connections_reference(reference.components)
+	assert creation.serialize() == reference.serialize()
+	assert creation.bridge_connections() == 0
+
+def test_large_fanout():
+	creation = Creation()
+	clock = creation.new_component(ComponentTypes.NODE)
+	gates = [creation.new_component(ComponentTypes.GATE_AND) for _ in range(50_000)]
+
+	# The clock drives every gate, only half of the gates list it as an input
+	clock.outputs.extend(gates)
+
+	for gate in gates[:25_000]:
+		gate.inputs.append(clock)
+
+	assert creation.bridge_connections() == 25_000
+	assert creation.bridge_connections() == 0
+	assert all(gate.inputs == [clock] for gate in gates)
+
+	# Every gate appears twice in the first 10k entries
+	creation.components[1:1] = gates[:10_000]
+	assert creation.deduplicate_components() == 10_000
+	assert creation.components == [clock, *gates]
+	assert creation.deduplicate_components() == 0
+
+def _reachable(adjacency, roots):
+	explored = set(roots)
+	unexplored = collections.deque(explored)
+
+	while unexplored:
+		for subnode in adjacency[unexplored.popleft()]:
+			if subnode not in explored:
+				explored.add(subnode)
+				unexplored.append(subnode)
+
+	return explored
+
+def test_cones_on_a_large_graph():
+	size = 100_000
+	rng = random.Random(3)
+	creation = Creation()
+	components = [creation.new_component(ComponentTypes.GATE_AND) for _ in range(size)]
+	fanout = [[] for _ in range(size)]
+	fanin = [[] for _ in range(size)]
+
+	# Dense enough for a giant strongly connected part, cones cover about half of the graph
+	for _ in range(size * 3 // 2):
+		a, b = rng.randrange(size), rng.randrange(size)
+		components[a].outputs.append(components[b])
+		components[b].inputs.append(components[a])
+		fanout[a].append(b)
+		fanin[b].append(a)
+
+	index = {id(component): idx for idx, component in enumerate(components)}
+	roots = rng.sample(range(size), 20)
+
+	for direction, adjacency in [("inputs", fanin), ("outputs", fanout)]:
+		cone = [index[id(node)] for node in creation.find_cone([components[root] for root in roots + roots[:5]], direction)]
+
+		assert len(cone) == len(set(cone))
+		assert set(cone) == _reachable(adjacency, roots)
+
+	requirements = [index[id(node)] for (node, _) in creation.find_requirements(components[roots[0]])]
+	assert len(requirements) == len(set(requirements))
+	assert set(requirements) == _reachable(fanout, roots[:1])
+
+	cone = creation.find_cone([components[root] for root in roots])
+	extracted = creation.extract_cone([components[root] for root in roots])
+	copies = {id(component) for component in extracted.components}
+
+	assert len(extracted.components) == len(cone)
+	assert not copies & set(index)
+	assert all(id(node) in copies for component in extracted.components for node in component.inputs + component.outputs)
+
+	# Every link between two nodes of the cone is kept, nothing else
+	members = {id(node) for node in cone}
+	internal = sum(id(o) in members for node in cone for o in node.outputs)
+	assert sum(len(component.outputs) for component in extracted.components) == internal
+
+# Wire order of a Creation depends on its connection lists, parsing and writing again sorts the wires
+def _canonical(text):
+	return CreationArrays().deserialize(text).serialize(round_positions=False)
+
+def _example_creation():
+	creation = Creation()
+	led = creation.new_component(ComponentTypes.LED, position=(0.5, 1.25, -2.75), augments=(10, 20, 30, 90, 5, 1))
+	delay = creation.new_component(ComponentTypes.DELAY, StateTypes.ON, (1, 0, 0.5), augments=(5,))
+	antenna = creation.new_component(ComponentTypes.ANTENNA, position=(2.125, 3, -4), augments=(3, AntennaTypes.GLOBAL))
+	gate = creation.new_component(ComponentTypes.GATE_AND, position=(-1.5, 0, 7))
+
+	# Duplicate connections, in the same list and across both ends
+	led.outputs += [delay, delay]
+	delay.inputs.append(led)
+	gate.inputs += [antenna, led]
+	antenna.outputs.append(gate)
+	gate.outputs.append(gate)
+
+	return creation
+
+@pytest.mark.parametrize("creation", [Creation(), _example_creation()], ids=["empty", "example"])
+def test_creation_binary_round_trip(tmp_path, creation):
+	text = creation.serialize(round_positions=False)
+	creation.save_binary(tmp_path / "save.cm2b")
+
+	loaded = Creation()
+	loaded.load_binary(tmp_path / "save.cm2b")
+
+	assert _canonical(loaded.serialize(round_positions=False)) == _canonical(text)
+	assert CreationArrays().load_binary(tmp_path / "save.cm2b").serialize(round_positions=False) == _canonical(text)
+
+@pytest.mark.parametrize("text", [
+	"???",
+	"6,,0.5,1.25,-2.75,10+20+30+90+5+1;16,1,1,,0.5,5;17,,2.125,3,-4,3+1;1,,-1.5,,7,?1,2;1,2;2,1;3,4;1,4;4,4??"
+], ids=["empty", "example"])
+def test_arrays_binary_round_trip(tmp_path, text):
+	arrays = CreationArrays().deserialize(text)
+	arrays.save_binary(tmp_path / "save.cm2b")
+	loaded = CreationArrays().load_binary(tmp_path / "save.cm2b")
+
+	assert loaded.serialize(round_positions=False) == arrays.serialize(round_positions=False)
+
+	# Duplicate wires are kept by the binary format and only dropped when writing optimized text
+	[blocks, wires, *_] = text.split('?')
+	[loaded_blocks, loaded_wires, *_] = loaded.serialize(optimize_wires=False, round_positions=False).split('?')
+
+	assert loaded_blocks == blocks
+	assert sorted(filter(None, loaded_wires.split(';'))) == sorted(filter(None, wires.split(';')))
+
+	creation = Creation()
+	creation.deserialize(text)
+
+	assert _canonical(loaded.to_creation().serialize(round_positions=False)) == _canonical(creation.serialize(round_positions=False))
+
+def test_binary_without_augments(tmp_path):
+	creation = Creation()
+	creation.new_component(ComponentTypes.LED, augments=(1, 2, 3, 4, 5, 1))
+	creation.save_binary(tmp_path / "save.cm2b")
+
+	arrays = CreationArrays().load_binary(tmp_path / "save.cm2b", load_augments=False)
+
+	assert len(arrays) == 1
+
+	for use in [arrays.serialize, arrays.to_creation, lambda: arrays.save_binary(tmp_path / "copy.cm2b"), lambda: arrays.get_augments(0), lambda: arrays.subset([0]).serialize()]:
+		with pytest.raises(ValueError):
+			use()
+
+@pytest.mark.parametrize("block", ["1,2,,,,", "1,256,,,,", "1,-1,,,,", "1,0.5,,,,", "256,0,,,,", "1.5,1,,,,", "1,,,,"])
+def test_parse_blocks_rejects_invalid_fields(block):
+	with pytest.raises(ValueError):
+		parse_blocks(["1,1,,,,", block])
+
+@pytest.mark.parametrize("cache", [False, True])
+def test_deserialize_file_keeps_components_list(tmp_path, monkeypatch, cache):
+	monkeypatch.setattr(CircuitMaker, "parse_cache", ParseCache(tmp_path / "cache"))
+	_example_creation().serialize_file(tmp_path / "save.txt")
+
+	creation = Creation()
+	components = creation.components
+
+	for _ in range(2):
+		creation.deserialize_file(tmp_path / "save.txt", cache=cache)
+
+	assert creation.components is components
+	assert len(components) == 4
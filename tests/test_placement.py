@@ -0,0 +1,61 @@
+import random
+
+import numpy as np
+import pytest
+
+from Placement import Legalizer, legalize
+
+
+def _cells(positions):
+	return [tuple(cell) for cell in np.round(positions).astype(np.int64).tolist()]
+
+@pytest.mark.parametrize("tolerance", [0.0, 0.1])
+def test_legalize_without_overlaps(tolerance):
+	rng = np.random.default_rng(0)
+	positions = rng.normal(0, 4, (3000, 3))
+	positions[:, 1] = rng.integers(0, 2, len(positions))
+
+	movable = rng.permutation(len(positions))[:2500]
+	fixed = np.setdiff1d(np.arange(len(positions)), movable)
+	occupied = [(x, y, 0) for x in range(-3, 4) for y in range(2)]
+
+	result = legalize(positions, movable, occupied, tolerance)
+	cells = _cells(result[movable])
+
+	assert (result[movable] == np.round(result[movable])).all()
+	assert len(set(cells)) == len(cells)
+	assert not set(cells) & set(_cells(positions[fixed]))
+	assert not set(cells) & set(occupied)
+	assert (result[fixed] == positions[fixed]).all()
+
+def test_legalize_keeps_legal_input():
+	rng = np.random.default_rng(1)
+	cells = rng.permutation(100 * 100)[:5000]
+	positions = np.stack((cells % 100, rng.integers(0, 3, len(cells)), cells // 100), axis=1).astype(np.float64)
+
+	assert (legalize(positions) == positions).all()
+	assert (legalize(positions, np.arange(0, len(positions), 2)) == positions).all()
+
+@pytest.mark.parametrize("tolerance", [0.0, 0.1])
+def test_nearest_within_tolerance(tolerance):
+	rng = random.Random(2)
+	legalizer = Legalizer()
+	occupied = set()
+
+	for _ in range(300):
+		cell = (rng.randint(-10, 10), 0, rng.randint(-10, 10))
+		legalizer.occupy(cell)
+		occupied.add(cell)
+
+	for _ in range(300):
+		position = (rng.gauss(0, 4), 0, rng.gauss(0, 4))
+		cell = legalizer.place(position, tolerance)
+
+		# Brute force over a window that is guaranteed to hold a free cell
+		best = min((x - position[0]) ** 2 + (z - position[2]) ** 2 for x in range(-40, 41) for z in range(-40, 41) if (x, 0, z) not in occupied)
+		cost = (cell[0] - position[0]) ** 2 + (cell[2] - position[2]) ** 2
+
+		assert cell not in occupied
+		assert cost <= best * (1 + tolerance) ** 2 + 1e-9
+
+		occupied.add(cell)